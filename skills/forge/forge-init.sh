@@ -299,6 +299,9 @@ FORGE_GITIGNORE_ENTRIES="
 .env
 .env.*
 .forge/memory/index.sqlite*
+.forge/memory/daemon.sock
+.forge/memory/reembed.*
+.forge/memory/sync.lock
 *.pem
 *.key"
 
@@ -0,0 +1,414 @@
+"""FORGE Vector Memory — Benchmark suite on a synthetic corpus.
+
+``forge-memory bench`` generates a reproducible .forge/memory/ tree (topic
+files with sections and code blocks, agent notes, session logs) in a
+scratch project and measures:
+
+- chunking throughput and peak memory of the markdown chunker alone,
+  streaming each file and, as a baseline, on each file's whole text;
+- sync: the cold first sync, a warm rebuild (``--force`` with every
+  embedding cached), a no-op sync and incremental syncs after single-file
+  edits;
+- search latency percentiles per mode (unfiltered, namespace filter, agent
+  filter, and amortised per query in a batch), with the result cache off,
+  of repeated unfiltered searches served from the cache, and of the same
+  queries with their words reordered, served from the cached results of
+  the similar query;
+- database size per chunk and the peak RSS of the process.
+
+The report is a single JSON document so runs can be compared across
+commits. With the ``hash`` embedder backend (the CLI default) no model is
+loaded and the numbers isolate indexing and retrieval costs.
+"""
+from __future__ import annotations
+
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import TypedDict
+
+from chunker import chunk_file, chunk_markdown
+from config import (
+    EMBEDDING_DIM,
+    MODEL_ID,
+    SEARCH_CACHE_SIZE,
+    VECTOR_QUANTIZATION,
+    get_db_path,
+    get_memory_dir,
+)
+
+# Report layout version, bumped when keys change meaning
+REPORT_VERSION = 1
+
+_WORDS = (
+    "auth token session cache refresh login user account password hash "
+    "database schema migration index query table column row transaction lock "
+    "api endpoint request response header status error retry timeout queue "
+    "worker job schedule cron event stream message broker topic partition "
+    "deploy release build pipeline test fixture mock coverage lint format "
+    "config secret env flag feature rollout metric trace log alert dashboard "
+    "story sprint epic backlog review merge branch commit tag version "
+    "frontend component state render route form validation style layout "
+    "vector embedding chunk search rank score model memory agent context"
+).split()
+
+_AGENTS = ("pm", "architect", "dev", "qa", "lead")
+
+_FIRST_SESSION = date(2026, 1, 1)
+
+
+class CorpusSpec(TypedDict):
+    files: int          # Topic files under .forge/memory/topics/
+    sections: int       # ## sections per topic file
+    code_blocks: int    # Fenced code blocks per topic file
+    sessions: int       # Daily session logs
+    entries: int        # Log entries per session
+    seed: int
+
+
+# ---------------------------------------------------------------------------
+# Corpus generation
+# ---------------------------------------------------------------------------
+
+def _words(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(
+        _words(rng, 6, 14).capitalize() + "." for _ in range(rng.randint(2, 6))
+    )
+
+
+def _code_block(rng: random.Random, name: str) -> str:
+    lines = [f"def {name}(value):"]
+    for _ in range(rng.randint(3, 12)):
+        lines.append(f"    value = value {rng.choice('+-*')} {rng.randint(1, 99)}"
+                     f"  # {_words(rng, 2, 5)}")
+    lines.append("    return value")
+    return "```python\n" + "\n".join(lines) + "\n```"
+
+
+def _section(rng: random.Random, level: str, code: list[str]) -> str:
+    parts = [f"{level} {_words(rng, 2, 4).title()}"]
+    parts += [_paragraph(rng) for _ in range(rng.randint(1, 3))]
+    parts += code
+    return "\n\n".join(parts)
+
+
+def _topic_file(rng: random.Random, index: int, spec: CorpusSpec) -> str:
+    sections = max(1, spec["sections"])
+    code: list[list[str]] = [[] for _ in range(sections)]
+    for block in range(spec["code_blocks"]):
+        code[block % sections].append(_code_block(rng, f"topic_{index}_{block}"))
+    parts = [f"# Topic {index}: {_words(rng, 2, 4)}", _paragraph(rng)]
+    parts += [_section(rng, "##", code[s]) for s in range(sections)]
+    return "\n\n".join(parts) + "\n"
+
+
+def _session_file(rng: random.Random, day: date, entries: int) -> str:
+    lines = [f"# Session — {day.isoformat()}", ""]
+    for n in range(entries):
+        seconds = 8 * 3600 + n * 600 + rng.randint(0, 599)
+        stamp = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        lines.append(f"- **{stamp}** [{rng.choice(_AGENTS)}] "
+                     f"(STORY-{rng.randint(1, 400):03d}) — {_words(rng, 5, 20)}")
+    return "\n".join(lines) + "\n"
+
+
+def _write(path: str, text: str) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = text.encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def generate_corpus(project_root: str, spec: CorpusSpec) -> dict[str, int]:
+    """Write a synthetic .forge/memory/ tree under *project_root*.
+
+    The same *spec* (including its seed) always produces the same bytes.
+
+    Returns
+    -------
+    ``{"files": N, "bytes": N}`` for the generated markdown.
+    """
+    rng = random.Random(spec["seed"])
+    memory_dir = get_memory_dir(project_root)
+    files = size = 0
+
+    size += _write(os.path.join(memory_dir, "MEMORY.md"),
+                   "# Project memory\n\n" + "\n\n".join(
+                       _section(rng, "##", []) for _ in range(max(1, spec["sections"]))
+                   ) + "\n")
+    files += 1
+    for index in range(spec["files"]):
+        size += _write(os.path.join(memory_dir, "topics", f"topic-{index:04d}.md"),
+                       _topic_file(rng, index, spec))
+        files += 1
+    for name in _AGENTS:
+        size += _write(os.path.join(memory_dir, "agents", f"{name}.md"),
+                       f"# Agent {name}\n\n" + "\n\n".join(
+                           _section(rng, "##", []) for _ in range(max(1, spec["sections"]))
+                       ) + "\n")
+        files += 1
+    for n in range(spec["sessions"]):
+        day = _FIRST_SESSION + timedelta(days=n)
+        size += _write(os.path.join(memory_dir, "sessions", f"{day.isoformat()}.md"),
+                       _session_file(rng, day, spec["entries"]))
+        files += 1
+    return {"files": files, "bytes": size}
+
+
+def _queries(rng: random.Random, count: int) -> list[str]:
+    return [_words(rng, 2, 5) for _ in range(count)]
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+def _percentiles(samples_s: list[float]) -> dict[str, float]:
+    """Summarise latencies (seconds) as milliseconds, nearest-rank."""
+    ordered = sorted(samples_s)
+    if not ordered:
+        return {"n": 0}
+
+    def pick(pct: float) -> float:
+        return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "p99_ms": round(pick(99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _timed(fn, *args, **kwargs) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def _chunk_streaming(path: str) -> int:
+    return sum(1 for _ in chunk_file(path))
+
+
+def _chunk_whole_text(path: str) -> int:
+    with open(path, encoding="utf-8") as f:
+        return len(chunk_markdown(f.read()))
+
+
+def _chunker_pass(chunk, paths: list[str], corpus_bytes: int) -> dict:
+    """Time *chunk* over *paths*, then measure its peak memory per file."""
+    seconds, chunks = _timed(lambda: sum(chunk(p) for p in paths))
+    # Apart from the timing: tracing slows every allocation down
+    peak = 0
+    tracemalloc.start()
+    try:
+        for path in paths:
+            tracemalloc.reset_peak()
+            chunk(path)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return {
+        "chunks": chunks,
+        "mb_per_s": round(corpus_bytes / (1024 * 1024) / max(seconds, 1e-9), 1),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    if sys.platform != "darwin":
+        peak *= 1024
+    return round(peak / (1024 * 1024), 1)
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _log(verbose: bool, message: str) -> None:
+    if verbose:
+        print(message, file=sys.stderr, flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def run(
+    spec: CorpusSpec,
+    *,
+    queries: int = 200,
+    incremental: int = 20,
+    project_root: str | None = None,
+    verbose: bool = False,
+) -> dict:
+    """Generate a corpus, index and search it, and return the report.
+
+    Parameters
+    ----------
+    spec:
+        Size and seed of the synthetic corpus.
+    queries:
+        Searches timed per search mode.
+    incremental:
+        Single-file edits, each followed by a timed sync.
+    project_root:
+        Empty or missing directory to build the scratch project in; it is
+        kept afterwards. By default a temporary directory is used and
+        removed.
+    verbose:
+        If ``True``, print progress to stderr.
+
+    Returns
+    -------
+    The JSON-serialisable benchmark report.
+    """
+    from db import init_db
+    from embedder import encode_single
+    from search import search, search_batch
+    from sync import sync
+
+    own_root = project_root is None
+    if own_root:
+        project_root = tempfile.mkdtemp(prefix="forge-bench-")
+    elif os.path.exists(project_root) and os.listdir(project_root):
+        raise ValueError(f"Benchmark directory is not empty: {project_root}")
+
+    rng = random.Random(spec["seed"] + 1)
+    report: dict = {
+        "version": REPORT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "embedder": MODEL_ID,
+        "embedding_dim": EMBEDDING_DIM,
+        "vector_quantization": VECTOR_QUANTIZATION,
+        "spec": dict(spec),
+    }
+    try:
+        _log(verbose, f"Generating corpus in {project_root}...")
+        report["corpus"] = generate_corpus(project_root, spec)
+
+        paths = sorted(
+            os.path.join(dirpath, name)
+            for dirpath, _dirs, names in os.walk(get_memory_dir(project_root))
+            for name in names if name.endswith(".md")
+        )
+        corpus_bytes = report["corpus"]["bytes"]
+        report["chunker"] = {
+            **_chunker_pass(_chunk_streaming, paths, corpus_bytes),
+            # Reading each file whole and listing its chunks, as sync did
+            # before the chunker streamed
+            "whole_text": _chunker_pass(_chunk_whole_text, paths, corpus_bytes),
+        }
+
+        # Model load is reported apart so that it does not skew the cold sync
+        report["model_load_s"] = round(_timed(encode_single, "warm-up")[0], 3)
+
+        db = init_db(get_db_path(project_root))
+        try:
+            _log(verbose, "Cold sync...")
+            cold_s, stats = _timed(sync, project_root, db=db)
+            chunks = db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            warm_s, _stats = _timed(sync, project_root, db=db, force=True)
+            noop_s, _stats = _timed(sync, project_root, db=db)
+
+            _log(verbose, f"Incremental syncs ({incremental})...")
+            edits = []
+            for n in range(incremental):
+                path = rng.choice(paths)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n" + _section(rng, "##", []) + "\n")
+                edits.append(_timed(sync, project_root, db=db)[0])
+
+            megabytes = report["corpus"]["bytes"] / (1024 * 1024)
+            report["sync"] = {
+                "files": stats["added"],
+                "chunks": chunks,
+                "embedded": stats["embedded"],
+                "cold_s": round(cold_s, 3),
+                "cold_chunks_per_s": round(chunks / max(cold_s, 1e-9), 1),
+                "cold_mb_per_s": round(megabytes / max(cold_s, 1e-9), 3),
+                "warm_force_s": round(warm_s, 3),
+                "noop_ms": round(noop_s * 1000, 3),
+                "incremental": _percentiles(edits),
+            }
+
+            _log(verbose, f"Searches ({queries} per mode)...")
+            texts = _queries(rng, queries)
+            search(project_root, "warm-up", db=db, cache=False)
+            modes = {
+                "all": {},
+                "namespace": {"namespace": "session"},
+                "agent": {"namespace": "agent", "agent": "dev"},
+            }
+            report["search"] = {
+                mode: _percentiles([
+                    _timed(search, project_root, text, db=db, cache=False, **filters)[0]
+                    for text in texts
+                ])
+                for mode, filters in modes.items()
+            }
+            batch_s, _results = _timed(lambda: list(search_batch(
+                project_root, [{"query": t} for t in texts], db=db, cache=False,
+            )))
+            report["search"]["batch"] = {
+                "n": len(texts),
+                "mean_ms": round(batch_s / max(len(texts), 1) * 1000, 3),
+            }
+            # Few enough queries that the originals and their reordered
+            # copies all fit in the cache
+            repeated = texts[:SEARCH_CACHE_SIZE // 2]
+            for text in repeated:
+                search(project_root, text, db=db)
+            report["search"]["cached"] = _percentiles([
+                _timed(search, project_root, text, db=db)[0] for text in repeated
+            ])
+            reordered = [" ".join(reversed(text.split())) for text in repeated]
+            report["search"]["similar"] = _percentiles([
+                _timed(search, project_root, text, db=db)[0] for text in reordered
+            ])
+
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            chunks = db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        finally:
+            db.close()
+
+        db_bytes = os.path.getsize(get_db_path(project_root))
+        report["db"] = {
+            "bytes": db_bytes,
+            "chunks": chunks,
+            "bytes_per_chunk": round(db_bytes / max(chunks, 1), 1),
+        }
+        report["peak_rss_mb"] = _peak_rss_mb()
+    finally:
+        if own_root:
+            shutil.rmtree(project_root, ignore_errors=True)
+    return report
@@ -5,8 +5,9 @@ while preserving heading context and keeping code blocks intact.
 """
 from __future__ import annotations
 
+import hashlib
 import re
-from typing import TypedDict
+from typing import Iterable, Iterator, TypedDict
 
 from config import CHUNK_OVERLAP_TOKENS, CHUNK_SIZE_TOKENS
 
@@ -34,194 +35,312 @@ def _estimate_tokens(text: str) -> int:
 _HEADING_RE = re.compile(r"^(#{2,3})\s+(.+)$")
 
 
-def _split_into_sections(lines: list[str]) -> list[dict]:
-    """Split lines into sections delimited by ## or ### headings.
+def _is_code_fence(line: str) -> bool:
+    stripped = line.strip()
+    return stripped.startswith("```")
 
-    Each section is a dict with keys: heading, start_line, lines.
-    """
-    sections: list[dict] = []
-    current_heading: str | None = None
-    current_start = 0
-    current_lines: list[str] = []
-
-    for idx, line in enumerate(lines):
-        m = _HEADING_RE.match(line)
-        if m:
-            # Flush previous section
-            if current_lines:
-                sections.append({
-                    "heading": current_heading,
-                    "start_line": current_start,
-                    "lines": current_lines,
-                })
-            current_heading = line.strip()
-            current_start = idx
-            current_lines = [line]
-        else:
-            current_lines.append(line)
 
-    # Flush last section
-    if current_lines:
-        sections.append({
-            "heading": current_heading,
-            "start_line": current_start,
-            "lines": current_lines,
-        })
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
 
-    return sections
+def section_start(lines: list[str], last_line: int) -> int:
+    """Return the index of the heading that starts the section containing *last_line*.
 
+    Sections are chunked independently, so re-chunking *lines* from the
+    returned index yields exactly the chunks a full pass would produce for
+    those sections. Returns ``0`` if no heading precedes *last_line*.
+    """
+    for idx in range(min(last_line, len(lines) - 1), -1, -1):
+        if _HEADING_RE.match(lines[idx]):
+            return idx
+    return 0
 
-def _is_code_fence(line: str) -> bool:
-    stripped = line.strip()
-    return stripped.startswith("```")
 
+def opens_section(text: str) -> bool:
+    """Return whether the chunk *text* is the first chunk of its section.
+
+    Every heading starts a section and its first chunk, so only those begin
+    with one; neighbouring chunks belong to the same section unless the
+    later one opens a new one, whatever their headings read.
+    """
+    return _HEADING_RE.match(text.partition("\n")[0]) is not None
 
-def _split_section_into_chunks(
-    section_lines: list[str],
-    section_start_line: int,
-    heading: str | None,
-    chunk_size: int,
-    overlap: int,
-) -> list[Chunk]:
-    """Split a single section's lines into token-bounded chunks.
 
-    Code blocks (delimited by ```) are never split mid-block.
-    Overlap is applied in characters (converted from tokens).
+def edge_lines(text: str, tokens: int, *, tail: bool) -> list[str]:
+    """Return the whole lines at the start (or end) of *text* worth *tokens*.
+
+    Tokens are estimated like chunk sizes. Returns an empty list if those
+    lines are blank, or if not even one line fits.
     """
-    chunk_size_chars = chunk_size * _CHARS_PER_TOKEN
-    overlap_chars = overlap * _CHARS_PER_TOKEN
-    chunks: list[Chunk] = []
-
-    # First, group lines into "blocks" — code blocks stay as atomic units,
-    # normal lines are individual blocks.
-    blocks: list[dict] = []  # {lines: [...], start_line: int, is_code: bool}
-    in_code = False
-    code_block_lines: list[str] = []
-    code_start = 0
-
-    for i, line in enumerate(section_lines):
-        abs_line = section_start_line + i
-        if _is_code_fence(line):
-            if in_code:
-                # End of code block
-                code_block_lines.append(line)
-                blocks.append({
-                    "lines": code_block_lines,
-                    "start_line": code_start,
-                    "is_code": True,
-                })
-                code_block_lines = []
-                in_code = False
-            else:
-                # Start of code block
-                in_code = True
-                code_block_lines = [line]
-                code_start = abs_line
-        elif in_code:
-            code_block_lines.append(line)
-        else:
-            blocks.append({
-                "lines": [line],
-                "start_line": abs_line,
-                "is_code": False,
-            })
-
-    # Handle unclosed code block
-    if code_block_lines:
-        blocks.append({
-            "lines": code_block_lines,
-            "start_line": code_start,
-            "is_code": True,
-        })
-
-    # Now assemble blocks into chunks respecting size limits
-    current_text_parts: list[str] = []
-    current_char_count = 0
-    current_start_line = section_start_line
-    current_end_line = section_start_line
-
-    def _flush():
-        nonlocal current_text_parts, current_char_count
-        nonlocal current_start_line, current_end_line
-        if not current_text_parts:
-            return
-        text = "\n".join(current_text_parts)
-        if text.strip():
-            chunks.append(Chunk(
-                text=text,
-                start_line=current_start_line,
-                end_line=current_end_line,
-                heading=heading,
-                token_count=_estimate_tokens(text),
-            ))
-        current_text_parts = []
-        current_char_count = 0
-
-    for block in blocks:
-        block_text = "\n".join(block["lines"])
-        block_chars = len(block_text)
-        block_start = block["start_line"]
-        block_end = block_start + len(block["lines"]) - 1
-
-        # If a single code block exceeds chunk_size, emit it as its own chunk
-        if block["is_code"] and block_chars > chunk_size_chars:
-            _flush()
-            current_start_line = block_start
-            current_end_line = block_end
-            current_text_parts = [block_text]
-            current_char_count = block_chars
-            _flush()
-            # Reset start line for next chunk
-            if blocks:
-                current_start_line = block_end + 1
-                current_end_line = block_end + 1
-            continue
+    lines = text.split("\n")
+    if tail:
+        lines.reverse()
+    budget = tokens * _CHARS_PER_TOKEN
+    taken: list[str] = []
+    for line in lines:
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        taken.append(line)
+    if tail:
+        taken.reverse()
+    return taken if "".join(taken).strip() else []
+
+
+def text_hash(text: str) -> str:
+    """Return the SHA-256 hex digest identifying a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_lines(f: Iterable[str]) -> Iterator[str]:
+    """Yield the lines of a text file without line endings.
+
+    *f* is a file opened in text mode (universal newlines). The lines are
+    the same as ``f.read().split("\\n")``, including the empty last line of
+    a file that ends with a newline, so :func:`iter_chunks` gives the same
+    chunks as :func:`chunk_markdown` on the whole text.
+    """
+    line = ""
+    for line in f:
+        yield line[:-1] if line.endswith("\n") else line
+    if line.endswith("\n") or not line:
+        yield ""
 
-        # Would adding this block exceed chunk size?
-        if current_char_count + block_chars > chunk_size_chars and current_text_parts:
-            _flush()
-            # Apply overlap: re-include the tail of the previous chunk
-            if overlap_chars > 0 and chunks:
-                prev_text = chunks[-1]["text"]
-                overlap_text = prev_text[-overlap_chars:]
-                # Find a clean line break within the overlap region
-                newline_pos = overlap_text.find("\n")
-                if newline_pos != -1:
-                    overlap_text = overlap_text[newline_pos + 1:]
-                if overlap_text.strip():
-                    current_text_parts = [overlap_text]
-                    current_char_count = len(overlap_text)
-                    # Adjust start_line: estimate from the previous chunk
-                    overlap_lines_count = overlap_text.count("\n") + 1
-                    current_start_line = max(
-                        section_start_line,
-                        chunks[-1]["end_line"] - overlap_lines_count + 1,
-                    )
-                else:
-                    current_start_line = block_start
-            else:
-                current_start_line = block_start
 
-        if not current_text_parts:
-            current_start_line = block_start
+def iter_chunks(
+    lines: Iterable[str],
+    *,
+    chunk_size: int = CHUNK_SIZE_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+    first_line: int = 0,
+    sizes: Iterable[int] | None = None,
+) -> Iterator[Chunk]:
+    """Chunk a markdown document given line by line, yielding each chunk.
+
+    Only the lines of the chunk being assembled (and of an open code block)
+    are held in memory, and each chunk's text is joined once, when it is
+    emitted.
+
+    Sections start at ``##`` and ``###`` headings and are chunked
+    independently. Code blocks (delimited by `````) are never split
+    mid-block; a code block larger than *chunk_size* becomes a chunk of its
+    own. When a chunk is full, the next one starts with up to *overlap*
+    tokens of its tail, from a line boundary.
+
+    Without *sizes*, tokens are estimated from the length of the text.
+    With *sizes*, the real token count of every line (see
+    :meth:`embedder.TokenCounter.count`), chunks are kept to *chunk_size*
+    tokens: overlap is made of whole lines and dropped when it would not
+    fit, and a code block larger than a chunk is split between lines. Only
+    a single line longer than *chunk_size* still makes a larger chunk.
 
-        current_text_parts.append(block_text)
-        current_char_count += block_chars
-        current_end_line = block_end
+    Parameters
+    ----------
+    lines:
+        The document's lines without line endings (see :func:`file_lines`).
+    chunk_size:
+        Target chunk size in tokens.
+    overlap:
+        Overlap between consecutive chunks in tokens.
+    first_line:
+        Line number of the first line in its file, used when chunking only
+        the tail of a document (see :func:`section_start`).
+    sizes:
+        Token count of each line of *lines*, in the same order.
+
+    Yields
+    ------
+    :class:`Chunk` dicts in document order.
+    """
+    if sizes is None:
+        chunk_limit = chunk_size * _CHARS_PER_TOKEN
+        overlap_limit = overlap * _CHARS_PER_TOKEN
+        line_sizes = None
+    else:
+        chunk_limit = chunk_size
+        overlap_limit = overlap
+        line_sizes = iter(sizes)
+
+    heading: str | None = None
+    section_line = first_line
+    # Text, lines (with sizes) and end line of the section's last chunk,
+    # the source of overlap
+    last_text: str | None = None
+    last_parts: list[str] = []
+    last_sizes: list[int] = []
+    last_end = 0
+    # The chunk being assembled: its lines and their size. Estimated sizes
+    # leave out the newlines between blocks (sizes are compared block by
+    # block); token sizes are kept per line.
+    parts: list[str] = []
+    part_sizes: list[int] = []
+    size = 0
+    start = end = first_line
+    # Lines (with sizes) of an open code block
+    code: list[str] | None = None
+    code_sizes: list[int] = []
+    code_line = 0
+
+    def flush() -> Chunk | None:
+        nonlocal parts, part_sizes, size, last_text, last_parts, last_sizes, last_end
+        if not parts:
+            return None
+        text = "\n".join(parts)
+        chunk_parts, chunk_sizes = parts, part_sizes
+        parts = []
+        part_sizes = []
+        size = 0
+        if not text.strip():
+            return None
+        last_text, last_parts, last_sizes, last_end = text, chunk_parts, chunk_sizes, end
+        return Chunk(
+            text=text,
+            start_line=start,
+            end_line=end,
+            heading=heading,
+            token_count=_estimate_tokens(text) if line_sizes is None else sum(chunk_sizes),
+        )
 
-    _flush()
-    return chunks
+    def overflow(block_line: int, block_size: int) -> Chunk | None:
+        """Emit the full chunk and seed the next one with its overlap."""
+        nonlocal parts, part_sizes, size, start
+        chunk = flush()
+        start = block_line
+        if overlap_limit <= 0 or last_text is None:
+            return chunk
+        if line_sizes is None:
+            tail = last_text[-overlap_limit:]
+            # Start the overlap on a clean line break
+            newline = tail.find("\n")
+            if newline != -1:
+                tail = tail[newline + 1:]
+            if tail.strip():
+                parts = [tail]
+                size = len(tail)
+                start = max(section_line, last_end - tail.count("\n"))
+            return chunk
+
+        # Whole trailing lines, as long as the next block still fits
+        taken = total = 0
+        for line_size in reversed(last_sizes):
+            if total + line_size > overlap_limit:
+                break
+            taken += 1
+            total += line_size
+        tail_parts = last_parts[len(last_parts) - taken:]
+        if taken and total + block_size <= chunk_limit and "".join(tail_parts).strip():
+            parts = tail_parts
+            part_sizes = last_sizes[len(last_sizes) - taken:]
+            size = total
+            start = max(section_line, last_end - taken + 1)
+        return chunk
+
+    def close_code() -> Iterator[Chunk]:
+        """Add the open code block to the chunk as one unit."""
+        nonlocal code, code_sizes, parts, size, start, end
+        block, block_sizes, code, code_sizes = code, code_sizes, None, []
+        if line_sizes is None:
+            block_size = sum(map(len, block)) + len(block) - 1
+        else:
+            block_size = sum(block_sizes)
+        block_end = code_line + len(block) - 1
+        if block_size > chunk_limit:
+            chunk = flush()
+            if chunk:
+                yield chunk
+            if line_sizes is None:
+                start, end = code_line, block_end
+                parts, size = block, block_size
+            else:
+                # Split between lines rather than let the model truncate it
+                start = code_line
+                for offset, (line, line_size) in enumerate(zip(block, block_sizes)):
+                    if size + line_size > chunk_limit and parts:
+                        chunk = flush()
+                        if chunk:
+                            yield chunk
+                        start = code_line + offset
+                    parts.append(line)
+                    part_sizes.append(line_size)
+                    size += line_size
+                    end = code_line + offset
+            chunk = flush()
+            if chunk:
+                yield chunk
+            start = end = block_end + 1
+            return
+        if size + block_size > chunk_limit and parts:
+            chunk = overflow(code_line, block_size)
+            if chunk:
+                yield chunk
+        if not parts:
+            start = code_line
+        parts.extend(block)
+        part_sizes.extend(block_sizes)
+        size += block_size
+        end = block_end
+
+    for line_no, line in enumerate(lines, first_line):
+        line_size = len(line) if line_sizes is None else next(line_sizes)
+        if line.startswith("##") and _HEADING_RE.match(line):
+            # End of the previous section
+            if code is not None:
+                yield from close_code()
+            chunk = flush()
+            if chunk:
+                yield chunk
+            heading = line.strip()
+            section_line = start = end = line_no
+            last_text = None
+
+        if code is not None:
+            code.append(line)
+            code_sizes.append(line_size)
+            if "```" in line and _is_code_fence(line):
+                yield from close_code()
+            continue
+        if "```" in line and _is_code_fence(line):
+            code = [line]
+            code_sizes = [line_size]
+            code_line = line_no
+            continue
 
+        # Any other line is a block of its own
+        if size + line_size > chunk_limit and parts:
+            chunk = overflow(line_no, line_size)
+            if chunk:
+                yield chunk
+        if not parts:
+            start = line_no
+        parts.append(line)
+        part_sizes.append(line_size)
+        size += line_size
+        end = line_no
+
+    # An unclosed code block runs to the end of the document
+    if code is not None:
+        yield from close_code()
+    chunk = flush()
+    if chunk:
+        yield chunk
+
+
+def chunk_file(path: str, **kwargs) -> Iterator[Chunk]:
+    """Chunk a markdown file without reading it into memory at once.
+
+    Keyword arguments are passed to :func:`iter_chunks`.
+    """
+    with open(path, encoding="utf-8") as f:
+        yield from iter_chunks(file_lines(f), **kwargs)
 
-# ---------------------------------------------------------------------------
-# Public API
-# ---------------------------------------------------------------------------
 
 def chunk_markdown(
     text: str,
     *,
     chunk_size: int = CHUNK_SIZE_TOKENS,
     overlap: int = CHUNK_OVERLAP_TOKENS,
+    first_line: int = 0,
 ) -> list[Chunk]:
     """Chunk a markdown document into token-bounded pieces.
 
@@ -233,27 +352,15 @@ def chunk_markdown(
         Target chunk size in tokens.
     overlap:
         Overlap between consecutive chunks in tokens.
+    first_line:
+        Line number of the first line of *text* in its file, used when
+        chunking only the tail of a document (see :func:`section_start`).
 
     Returns
     -------
     A list of :class:`Chunk` dicts with keys:
     ``text``, ``start_line``, ``end_line``, ``heading``, ``token_count``.
     """
-    if not text.strip():
-        return []
-
-    lines = text.split("\n")
-    sections = _split_into_sections(lines)
-
-    all_chunks: list[Chunk] = []
-    for section in sections:
-        section_chunks = _split_section_into_chunks(
-            section_lines=section["lines"],
-            section_start_line=section["start_line"],
-            heading=section["heading"],
-            chunk_size=chunk_size,
-            overlap=overlap,
-        )
-        all_chunks.extend(section_chunks)
-
-    return all_chunks
+    return list(iter_chunks(
+        text.split("\n"), chunk_size=chunk_size, overlap=overlap, first_line=first_line,
+    ))
@@ -4,10 +4,16 @@
 Usage:
     forge-memory sync   [--force] [--verbose]
     forge-memory search "query" [--namespace ...] [--agent ...] [--limit N] [--threshold F] [--pretty]
-    forge-memory status [--json]
+    forge-memory search --batch queries.jsonl [--namespace ...] [--limit N] ...
+    forge-memory status [--json] [--recall [--recall-k K]]
     forge-memory reset  --confirm
     forge-memory log    "message" [--agent NAME] [--story STORY-ID]
     forge-memory consolidate [--verbose]
+    forge-memory serve  [--idle-timeout SECONDS] [--stop] [--verbose]
+    forge-memory watch  [--debounce SECONDS] [--poll] [--interval SECONDS] [--verbose]
+    forge-memory export-onnx [--output DIR]
+    forge-memory reembed [--verbose]
+    forge-memory bench  [--files N] [--sessions N] [--queries N] [--embedder hash|configured] [--output FILE]
 """
 from __future__ import annotations
 
@@ -24,12 +30,22 @@ _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 if _SCRIPT_DIR not in sys.path:
     sys.path.insert(0, _SCRIPT_DIR)
 
-from config import get_db_path, get_memory_dir
+# Only lightweight modules are imported at load time. ``search``, ``sync``
+# and ``embedder`` pull in sentence_transformers / torch and ``db`` pulls in
+# sqlite_vec / numpy, so the commands that need them import them lazily;
+# ``log`` and ``consolidate`` never pay that cost.
+import daemon
+import timing
+from config import (
+    DAEMON_IDLE_TIMEOUT,
+    MODEL_ID,
+    ONNX_MODEL_DIR,
+    PROFILE,
+    get_db_path,
+    get_memory_dir,
+)
 from consolidate import consolidate as do_consolidate
-from db import get_connection, init_db
 from logger import log as do_log
-from search import search as do_search
-from sync import sync as do_sync
 
 
 # ---------------------------------------------------------------------------
@@ -53,6 +69,29 @@ def _find_project_root() -> str:
         current = parent
 
 
+def _call_daemon(
+    root: str, command: str, params: dict, profile: bool = False,
+) -> tuple[bool, object]:
+    """Run *command* through the warm daemon if one is listening.
+
+    Returns ``(True, result)`` when the daemon handled the request and
+    ``(False, None)`` when the caller should run it in-process. Exits with
+    an error if the daemon reports a failure. With *profile*, the daemon's
+    timing report is printed on stderr.
+    """
+    reply = daemon.request(root, command, params, profile=profile)
+    if reply is None:
+        return False, None
+    if reply.get("output"):
+        print(reply["output"], end="")
+    if reply.get("profile"):
+        timing.print_report(reply["profile"])
+    if not reply.get("ok"):
+        print(f"Error (daemon): {reply.get('error')}", file=sys.stderr)
+        sys.exit(1)
+    return True, reply.get("result")
+
+
 # ---------------------------------------------------------------------------
 # Commands
 # ---------------------------------------------------------------------------
@@ -65,51 +104,148 @@ def cmd_sync(args: argparse.Namespace) -> None:
         print(f"Memory dir:   {get_memory_dir(root)}")
         print()
 
-    stats = do_sync(root, force=args.force, verbose=args.verbose)
+    params = {"force": args.force, "verbose": args.verbose}
+    profile = args.profile or PROFILE
+    handled, stats = _call_daemon(root, "sync", params, profile)
+    if not handled:
+        with timing.profiling("sync", profile) as prof:
+            with timing.stage("import"):
+                from sync import sync as do_sync
+
+            try:
+                stats = do_sync(root, **params)
+            except TimeoutError as exc:
+                print(f"Error: {exc}", file=sys.stderr)
+                sys.exit(1)
+        if prof is not None:
+            timing.print_report(prof.report())
 
     print()
     print(f"Sync complete: "
           f"+{stats['added']} added, "
           f"~{stats['updated']} updated, "
           f"-{stats['deleted']} deleted, "
-          f"={stats['unchanged']} unchanged")
+          f"={stats['unchanged']} unchanged "
+          f"({stats['embedded']} chunk(s) embedded)")
+
+
+def _print_pretty(results: list) -> None:
+    """Print search results for humans."""
+    if not results:
+        print("No results found.")
+        return
+    if "similar_query" in results[0]:
+        print(f"Cached results of the similar query {results[0]['similar_query']!r} "
+              f"(similarity {results[0]['query_similarity']:.3f})")
+    for i, r in enumerate(results, 1):
+        print(f"\n{'='*60}")
+        print(f"Result {i}/{len(results)}  (score: {r['score']:.4f})")
+        print(f"File:      {r['file']}")
+        print(f"Namespace: {r['namespace']}")
+        if r["heading"]:
+            print(f"Heading:   {r['heading']}")
+        print(f"Lines:     {r['start_line']}-{r['end_line']}")
+        print(f"{'-'*60}")
+        print(r["text"])
+    print(f"\n{'='*60}")
+    print(f"{len(results)} result(s)")
+
+
+def _read_batch(path: str) -> list[dict]:
+    """Read a JSONL file of queries (``-`` for stdin).
+
+    Each line is either a JSON string or an object with a ``query`` key and
+    optional ``namespace``, ``agent``, ``limit`` and ``threshold``.
+    """
+    queries = []
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as exc:
+                print(f"Error: {path}:{lineno}: invalid JSON ({exc}).", file=sys.stderr)
+                sys.exit(1)
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not isinstance(item.get("query"), str):
+                print(f"Error: {path}:{lineno}: expected a string or an object with a "
+                      f"\"query\" string.", file=sys.stderr)
+                sys.exit(1)
+            queries.append(item)
+    return queries
 
 
 def cmd_search(args: argparse.Namespace) -> None:
-    """Run a hybrid search query."""
+    """Run a hybrid search query (or a batch of them)."""
+    if (args.query is None) == (args.batch is None):
+        print("Error: give either a query or --batch FILE.", file=sys.stderr)
+        sys.exit(1)
     root = _find_project_root()
 
     ns = args.namespace if args.namespace != "all" else None
-    results = do_search(
-        root,
-        args.query,
-        namespace=ns,
-        agent=args.agent,
-        limit=args.limit,
-        threshold=args.threshold,
-    )
+    params = {
+        "namespace": ns,
+        "agent": args.agent,
+        "limit": args.limit,
+        "threshold": args.threshold,
+    }
+    profile = args.profile or PROFILE
+    if args.batch is not None:
+        _search_batch(root, args, params, profile)
+        return
+
+    params["query"] = args.query
+    handled, results = _call_daemon(root, "search", params, profile)
+    if not handled:
+        with timing.profiling("search", profile) as prof:
+            with timing.stage("import"):
+                from search import search as do_search
+
+            results = do_search(root, **params)
+        if prof is not None:
+            timing.print_report(prof.report())
 
     if args.pretty:
-        if not results:
-            print("No results found.")
-            return
-        for i, r in enumerate(results, 1):
-            print(f"\n{'='*60}")
-            print(f"Result {i}/{len(results)}  (score: {r['score']:.4f})")
-            print(f"File:      {r['file']}")
-            print(f"Namespace: {r['namespace']}")
-            if r["heading"]:
-                print(f"Heading:   {r['heading']}")
-            print(f"Lines:     {r['start_line']}-{r['end_line']}")
-            print(f"{'-'*60}")
-            print(r["text"])
-        print(f"\n{'='*60}")
-        print(f"{len(results)} result(s)")
+        _print_pretty(results)
     else:
         output = {"results": results}
         print(json.dumps(output, indent=2, ensure_ascii=False))
 
 
+def _search_batch(root: str, args: argparse.Namespace, defaults: dict, profile: bool) -> None:
+    """Run every query of ``--batch`` and print one result set per query.
+
+    Command-line options are defaults for the queries. Without ``--pretty``
+    the output is JSONL: each input object with a ``results`` key added.
+    """
+    items = _read_batch(args.batch)
+    queries = [{**defaults, **item} for item in items]
+    for q in queries:
+        if q["namespace"] == "all":
+            q["namespace"] = None
+
+    handled, result_sets = _call_daemon(root, "search_batch", {"queries": queries}, profile)
+    # In-process, results are printed as they are produced, so the profile
+    # also covers writing them out
+    with timing.profiling("search_batch", profile and not handled) as prof:
+        if not handled:
+            with timing.stage("import"):
+                from search import search_batch
+
+            result_sets = search_batch(root, queries)
+
+        for item, results in zip(items, result_sets):
+            if args.pretty:
+                print(f"\n### {item['query']}")
+                _print_pretty(results)
+            else:
+                print(json.dumps({**item, "results": results}, ensure_ascii=False), flush=True)
+    if prof is not None:
+        timing.print_report(prof.report())
+
+
 def cmd_status(args: argparse.Namespace) -> None:
     """Show index status information."""
     root = _find_project_root()
@@ -129,7 +265,11 @@ def cmd_status(args: argparse.Namespace) -> None:
         info["db_size_bytes"] = 0
         info["model"] = None
     else:
-        db = get_connection(db_path)
+        from db import get_connection, init_db
+
+        # --recall searches, so the vector table must match the configured
+        # storage format (init_db converts it if needed)
+        db = init_db(db_path) if args.recall else get_connection(db_path)
 
         file_count = db.execute("SELECT COUNT(*) AS c FROM files").fetchone()["c"]
         chunk_count = db.execute("SELECT COUNT(*) AS c FROM chunks").fetchone()["c"]
@@ -153,9 +293,27 @@ def cmd_status(args: argparse.Namespace) -> None:
             "model": meta.get("embedding_model"),
             "embedding_dim": meta.get("embedding_dim"),
             "schema_version": meta.get("schema_version"),
+            "vector_quantization": meta.get("vector_quantization", "float"),
         })
+        if meta.get("embedding_model") != MODEL_ID or meta.get("reembed_table"):
+            import reembed
+
+            progress = reembed.progress(db)
+            info["reembed"] = {
+                "model": MODEL_ID,
+                "done": progress[0] if progress else 0,
+                "total": progress[1] if progress else chunk_count,
+                "failed": meta.get("reembed_failed") == MODEL_ID,
+            }
+        if args.recall:
+            from search import measure_recall
+
+            recall = measure_recall(db, k=args.recall_k)
+            info["recall_at_k"] = {"k": args.recall_k, "recall": recall}
         db.close()
 
+    info["daemon_running"] = daemon.is_running(root)
+
     if args.json:
         print(json.dumps(info, indent=2, ensure_ascii=False))
     else:
@@ -167,7 +325,19 @@ def cmd_status(args: argparse.Namespace) -> None:
             print(f"Database size:   {info.get('db_size_human', 'N/A')}")
             print(f"Model:           {info.get('model', 'N/A')}")
             print(f"Embedding dim:   {info.get('embedding_dim', 'N/A')}")
+            if "reembed" in info:
+                job = info["reembed"]
+                state = ("failed, see reembed.log; retry with 'forge-memory reembed'"
+                         if job["failed"] else f"{job['done']}/{job['total']} chunks")
+                print(f"Re-embedding:    {job['model']} ({state})")
             print(f"Schema version:  {info.get('schema_version', 'N/A')}")
+            quant = info.get("vector_quantization", "float")
+            vec_bytes = _vector_bytes(quant, int(info.get("embedding_dim") or 0))
+            print(f"Vector storage:  {quant} ({vec_bytes} B/vector in KNN table)")
+            if "recall_at_k" in info:
+                recall = info["recall_at_k"]["recall"]
+                shown = "N/A" if recall is None else f"{recall:.3f}"
+                print(f"Recall@{info['recall_at_k']['k']}:       {shown}")
             print(f"Files indexed:   {info['file_count']}")
             print(f"Total chunks:    {info['chunk_count']}")
             print(f"Namespaces:")
@@ -175,6 +345,58 @@ def cmd_status(args: argparse.Namespace) -> None:
                 print(f"  {ns:12s}  {count} file(s)")
         else:
             print(f"Database does not exist yet. Run 'forge-memory sync' first.")
+        print(f"Daemon:          {'running' if info['daemon_running'] else 'not running'}")
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    """Show sync and search latency percentiles from the telemetry table."""
+    import telemetry
+
+    try:
+        since = telemetry.parse_since(args.since) if args.since else None
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    root = _find_project_root()
+    db_path = get_db_path(root)
+    if not os.path.exists(db_path):
+        print("Database does not exist yet. Run 'forge-memory sync' first.", file=sys.stderr)
+        sys.exit(1)
+
+    from db import init_db
+
+    db = init_db(db_path)
+    info = telemetry.summary(db, since=since, command=args.command_name, by=args.by)
+    db.close()
+
+    if args.json:
+        print(json.dumps(info, indent=2, ensure_ascii=False))
+        return
+
+    print("FORGE Vector Memory — Stats")
+    print(f"{'='*40}")
+    print(f"Since:           {info['since'] or 'first record'}")
+    print(f"Rows:            {info['rows']}"
+          + (f" (oldest {info['first']})" if info["first"] else ""))
+    if not info["commands"]:
+        print("No syncs or searches recorded.")
+    for name, summary in info["commands"].items():
+        print()
+        print(f"{name}  n={summary['n']}  p50 {summary['p50_ms']:.1f} ms  "
+              f"p95 {summary['p95_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms  "
+              f"max {summary['max_ms']:.1f} ms")
+        print(f"  {info['by']:<32s}{'n':>7s}{'p50':>10s}{'p95':>10s}{'p99':>10s}")
+        for period, row in summary["periods"].items():
+            print(f"  {period:<32s}{row['n']:>7d}{row['p50_ms']:>10.1f}"
+                  f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+        print(f"  {'stage (ms)':<32s}{'n':>7s}{'p50':>10s}{'p95':>10s}{'p99':>10s}")
+        for stage, row in summary["stages"].items():
+            print(f"  {stage:<32s}{row['n']:>7d}{row['p50_ms']:>10.1f}"
+                  f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+        print(f"  {'counter':<32s}{'mean':>17s}{'max':>10s}")
+        for counter, row in summary["counters"].items():
+            print(f"  {counter:<32s}{row['mean']:>17.1f}{row['max']:>10d}")
 
 
 def cmd_log(args: argparse.Namespace) -> None:
@@ -217,10 +439,114 @@ def cmd_reset(args: argparse.Namespace) -> None:
                 os.remove(wal_path)
         print(f"Deleted: {db_path}")
 
+    from db import init_db
+
     init_db(db_path)
     print("Database recreated (empty).")
 
 
+def cmd_serve(args: argparse.Namespace) -> None:
+    """Run the warm daemon (or stop the running one)."""
+    root = _find_project_root()
+
+    if args.stop:
+        reply = daemon.request(root, "shutdown")
+        if reply is None:
+            print("No daemon running.")
+        else:
+            print(f"Daemon stopped (pid {reply['result']['pid']}).")
+        return
+
+    try:
+        daemon.serve(root, idle_timeout=args.idle_timeout, verbose=args.verbose)
+    except RuntimeError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_watch(args: argparse.Namespace) -> None:
+    """Re-index markdown files as they change, until interrupted."""
+    from watcher import watch
+
+    root = _find_project_root()
+    try:
+        watch(
+            root,
+            debounce=args.debounce,
+            poll=args.poll,
+            interval=args.interval,
+            verbose=args.verbose,
+        )
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
+def cmd_export_onnx(args: argparse.Namespace) -> None:
+    """Export the embedding model to int8 ONNX for the onnx backend."""
+    from onnx_export import export
+
+    try:
+        path = export(args.output or ONNX_MODEL_DIR, verbose=True)
+    except ImportError as exc:
+        print(f"Error: export-onnx needs torch, sentence-transformers and onnxruntime ({exc}).",
+              file=sys.stderr)
+        sys.exit(1)
+    print("Use it with: FORGE_EMBEDDING_BACKEND=onnx"
+          + (f" FORGE_ONNX_MODEL_DIR={os.path.dirname(path)}" if args.output else ""))
+
+
+def cmd_reembed(args: argparse.Namespace) -> None:
+    """Re-embed the index with the configured model, then switch to it."""
+    import reembed
+
+    root = _find_project_root()
+    try:
+        migrated = reembed.run(root, verbose=args.verbose)
+    except RuntimeError as exc:
+        # Workers started by search/sync race harmlessly for the lock
+        if args.background:
+            return
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    if migrated:
+        print(f"Index re-embedded with {MODEL_ID}.")
+    elif not args.background:
+        print(f"Index already uses {MODEL_ID}.")
+
+
+def cmd_bench(args: argparse.Namespace) -> None:
+    """Benchmark sync and search on a synthetic corpus."""
+    if args.embedder == "hash" and os.environ.get("FORGE_EMBEDDING_BACKEND") != "hash":
+        # The backend is read from the environment when config is imported,
+        # so restart with the stand-in embedder selected
+        os.environ["FORGE_EMBEDDING_BACKEND"] = "hash"
+        os.execv(sys.executable, [sys.executable, os.path.abspath(__file__), *sys.argv[1:]])
+
+    from bench import run
+
+    spec = {
+        "files": args.files,
+        "sections": args.sections,
+        "code_blocks": args.code_blocks,
+        "sessions": args.sessions,
+        "entries": args.entries,
+        "seed": args.seed,
+    }
+    try:
+        report = run(spec, queries=args.queries, incremental=args.incremental,
+                     project_root=args.keep, verbose=True)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
 def _human_size(size_bytes: int) -> str:
     """Format a byte count into a human-readable string."""
     for unit in ("B", "KB", "MB", "GB"):
@@ -230,6 +556,15 @@ def _human_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f} TB"
 
 
+def _vector_bytes(quantization: str, dim: int) -> int:
+    """Bytes per stored vector for a FORGE_VECTOR_QUANTIZATION format."""
+    if quantization == "int8":
+        return dim
+    if quantization == "bit":
+        return dim // 8
+    return dim * 4
+
+
 # ---------------------------------------------------------------------------
 # Argument parser
 # ---------------------------------------------------------------------------
@@ -245,10 +580,14 @@ def build_parser() -> argparse.ArgumentParser:
     p_sync = sub.add_parser("sync", help="Synchronise markdown files into the index.")
     p_sync.add_argument("--force", action="store_true", help="Re-index all files regardless of hash.")
     p_sync.add_argument("--verbose", action="store_true", help="Print progress info.")
+    p_sync.add_argument("--profile", action="store_true",
+                        help="Print per-stage timings as JSON on stderr.")
 
     # search -----------------------------------------------------------------
     p_search = sub.add_parser("search", help="Run a hybrid vector+FTS search.")
-    p_search.add_argument("query", help="Natural-language search query.")
+    p_search.add_argument("query", nargs="?", help="Natural-language search query.")
+    p_search.add_argument("--batch", metavar="FILE", default=None,
+                          help="Run every query of a JSONL file ('-' for stdin) in one process.")
     p_search.add_argument("--namespace", default="all",
                           choices=["all", "project", "session", "agent"],
                           help="Filter by namespace (default: all).")
@@ -256,10 +595,27 @@ def build_parser() -> argparse.ArgumentParser:
     p_search.add_argument("--limit", type=int, default=5, help="Max results (default: 5).")
     p_search.add_argument("--threshold", type=float, default=0.3, help="Min score threshold (default: 0.3).")
     p_search.add_argument("--pretty", action="store_true", help="Pretty-print instead of JSON.")
+    p_search.add_argument("--profile", action="store_true",
+                          help="Print per-stage timings as JSON on stderr.")
 
     # status -----------------------------------------------------------------
     p_status = sub.add_parser("status", help="Show index status.")
     p_status.add_argument("--json", action="store_true", help="Output as JSON.")
+    p_status.add_argument("--recall", action="store_true",
+                          help="Measure vector search recall@k against an exact scan.")
+    p_status.add_argument("--recall-k", type=int, default=10,
+                          help="k for --recall (default: 10).")
+
+    # stats ------------------------------------------------------------------
+    p_stats = sub.add_parser("stats", help="Show sync and search latency percentiles over time.")
+    p_stats.add_argument("--since", default=None,
+                         help="Only rows newer than a duration (30m, 12h, 7d, 4w) or an ISO date.")
+    p_stats.add_argument("--command", dest="command_name", default=None,
+                         choices=["sync", "search", "search_batch"],
+                         help="Only this command.")
+    p_stats.add_argument("--by", choices=["day", "week", "month"], default="day",
+                         help="Trend period (default: day).")
+    p_stats.add_argument("--json", action="store_true", help="Output as JSON.")
 
     # log --------------------------------------------------------------------
     p_log = sub.add_parser("log", help="Append a log entry to today's session file.")
@@ -275,6 +631,60 @@ def build_parser() -> argparse.ArgumentParser:
     p_reset = sub.add_parser("reset", help="Drop and recreate the database.")
     p_reset.add_argument("--confirm", action="store_true", help="Required to confirm reset.")
 
+    # serve ------------------------------------------------------------------
+    p_serve = sub.add_parser("serve", help="Keep the model and index warm for fast searches.")
+    p_serve.add_argument("--idle-timeout", type=float, default=DAEMON_IDLE_TIMEOUT,
+                         help=f"Exit after N idle seconds, 0 = never (default: {DAEMON_IDLE_TIMEOUT:g}).")
+    p_serve.add_argument("--stop", action="store_true", help="Stop the running daemon.")
+    p_serve.add_argument("--verbose", action="store_true", help="Print one line per request.")
+
+    # watch ------------------------------------------------------------------
+    p_watch = sub.add_parser("watch", help="Re-index markdown files as they change.")
+    p_watch.add_argument("--debounce", type=float, default=1.0,
+                         help="Seconds of quiet before indexing a burst of writes (default: 1).")
+    p_watch.add_argument("--poll", action="store_true", help="Poll instead of using inotify.")
+    p_watch.add_argument("--interval", type=float, default=2.0,
+                         help="Seconds between scans in polling mode (default: 2).")
+    p_watch.add_argument("--verbose", action="store_true", help="Print per-file sync details.")
+
+    # export-onnx ------------------------------------------------------------
+    p_export = sub.add_parser("export-onnx",
+                              help="Export the embedding model to int8 ONNX (onnx backend).")
+    p_export.add_argument("--output", default=None,
+                          help=f"Output directory (default: {ONNX_MODEL_DIR}).")
+
+    # reembed ----------------------------------------------------------------
+    p_reembed = sub.add_parser(
+        "reembed",
+        help="Re-embed the index after a model change (normally runs in the background).",
+    )
+    p_reembed.add_argument("--verbose", action="store_true", help="Print progress per batch.")
+    p_reembed.add_argument("--background", action="store_true", help=argparse.SUPPRESS)
+
+    # bench ------------------------------------------------------------------
+    p_bench = sub.add_parser("bench", help="Benchmark sync and search on a synthetic corpus.")
+    p_bench.add_argument("--files", type=int, default=200, help="Topic files (default: 200).")
+    p_bench.add_argument("--sections", type=int, default=6,
+                         help="Sections per file (default: 6).")
+    p_bench.add_argument("--code-blocks", type=int, default=2,
+                         help="Code blocks per topic file (default: 2).")
+    p_bench.add_argument("--sessions", type=int, default=30,
+                         help="Session logs (default: 30).")
+    p_bench.add_argument("--entries", type=int, default=40,
+                         help="Entries per session log (default: 40).")
+    p_bench.add_argument("--queries", type=int, default=200,
+                         help="Searches timed per mode (default: 200).")
+    p_bench.add_argument("--incremental", type=int, default=20,
+                         help="Timed single-file edit + sync rounds (default: 20).")
+    p_bench.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0).")
+    p_bench.add_argument("--embedder", choices=["hash", "configured"], default="hash",
+                         help="hash: deterministic stand-in, no model (default); "
+                              "configured: the FORGE_EMBEDDING_* model.")
+    p_bench.add_argument("--keep", metavar="DIR", default=None,
+                         help="Build the scratch project in DIR and keep it.")
+    p_bench.add_argument("--output", metavar="FILE", default=None,
+                         help="Write the JSON report to FILE instead of stdout.")
+
     return parser
 
 
@@ -290,9 +700,15 @@ def main() -> None:
         "sync": cmd_sync,
         "search": cmd_search,
         "status": cmd_status,
+        "stats": cmd_stats,
         "log": cmd_log,
         "consolidate": cmd_consolidate,
         "reset": cmd_reset,
+        "serve": cmd_serve,
+        "watch": cmd_watch,
+        "export-onnx": cmd_export_onnx,
+        "reembed": cmd_reembed,
+        "bench": cmd_bench,
     }
 
     handler = dispatch.get(args.command)
@@ -1,28 +1,111 @@
 """FORGE Vector Memory — Configuration"""
 import os
 
-# Embedding model
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-EMBEDDING_DIM = 384
+# Embedding model. Changing it (or the backend below) re-embeds an existing
+# index in the background while searches keep using the old vectors.
+EMBEDDING_MODEL = os.environ.get("FORGE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_DIM = int(os.environ.get("FORGE_EMBEDDING_DIM", "384"))
+# Inference backend: sentence-transformers (torch), onnx (ONNX Runtime,
+# int8-quantized export created by ``forge-memory export-onnx``) or hash
+# (deterministic stand-in without a model, for benchmarks)
+EMBEDDING_BACKEND = os.environ.get("FORGE_EMBEDDING_BACKEND", "sentence-transformers")
+# Where ``forge-memory export-onnx`` writes a model's export by default
+_ONNX_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+ONNX_MODEL_DIR = os.environ.get(
+    "FORGE_ONNX_MODEL_DIR",
+    os.path.join(_ONNX_MODELS_DIR, f"{EMBEDDING_MODEL}-onnx-int8"),
+)
+# Identifies the vectors the configured model + backend produce; keys the
+# embedding cache. Backends other than the reference one yield slightly
+# different vectors, so they get their own id. The hash stand-in ignores the
+# model: its vectors only depend on their width, which its id carries.
+if EMBEDDING_BACKEND == "sentence-transformers":
+    MODEL_ID = EMBEDDING_MODEL
+elif EMBEDDING_BACKEND == "hash":
+    MODEL_ID = f"hash:{EMBEDDING_DIM}@hash"
+else:
+    MODEL_ID = f"{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}"
+# Texts per model call; sync groups chunks from all changed files into
+# length-sorted batches of this size
+EMBED_BATCH_SIZE = int(os.environ.get("FORGE_EMBED_BATCH_SIZE", "64"))
+
+# Vector storage in the KNN table: float (exact), int8 or bit. Quantized
+# vectors are only used for the coarse pass; the top candidates are
+# re-scored against the full-precision copy in the embedding cache.
+VECTOR_QUANTIZATION = os.environ.get("FORGE_VECTOR_QUANTIZATION", "float")
 
 # Chunking
 CHUNK_SIZE_TOKENS = int(os.environ.get("FORGE_CHUNK_SIZE", "400"))
 CHUNK_OVERLAP_TOKENS = int(os.environ.get("FORGE_CHUNK_OVERLAP", "80"))
+# "overlap": each chunk repeats the last CHUNK_OVERLAP_TOKENS of the one
+# before it. "stitch": chunks are stored without overlap (less to embed and
+# store) and search adds that much context from the neighbouring chunks of
+# each hit instead.
+CHUNK_OVERLAP_MODE = os.environ.get("FORGE_CHUNK_OVERLAP_MODE", "overlap")
+if CHUNK_OVERLAP_MODE not in ("overlap", "stitch"):
+    raise ValueError(
+        f"FORGE_CHUNK_OVERLAP_MODE must be one of overlap, stitch, not {CHUNK_OVERLAP_MODE!r}"
+    )
+# How chunk sizes are measured: "estimate" (4 characters per token) or
+# "model" (the embedding model's tokenizer, with chunks capped at its max
+# sequence length so no text is truncated away when embedding)
+CHUNK_TOKENIZER = os.environ.get("FORGE_CHUNK_TOKENIZER", "estimate")
+if CHUNK_TOKENIZER not in ("estimate", "model"):
+    raise ValueError(
+        f"FORGE_CHUNK_TOKENIZER must be one of estimate, model, not {CHUNK_TOKENIZER!r}"
+    )
 
 # Search
 VECTOR_WEIGHT = float(os.environ.get("FORGE_VECTOR_WEIGHT", "0.7"))
 FTS_WEIGHT = float(os.environ.get("FORGE_FTS_WEIGHT", "0.3"))
 DEFAULT_LIMIT = int(os.environ.get("FORGE_SEARCH_LIMIT", "5"))
 DEFAULT_THRESHOLD = float(os.environ.get("FORGE_SEARCH_THRESHOLD", "0.3"))
+# Result lists kept for repeated searches on an unchanged index (0 = off)
+SEARCH_CACHE_SIZE = int(os.environ.get("FORGE_SEARCH_CACHE_SIZE", "256"))
+# Cosine similarity from which a new query reuses the cached results of a
+# near-identical one (e.g. the same words reordered); 0 = exact repeats only
+SEARCH_CACHE_SIMILARITY = float(os.environ.get("FORGE_SEARCH_CACHE_SIMILARITY", "0.95"))
 
 # Paths (relative to project root)
 MEMORY_DIR = ".forge/memory"
 DB_FILENAME = "index.sqlite"
+REEMBED_LOCK_FILENAME = "reembed.lock"
+SYNC_LOCK_FILENAME = "sync.lock"
+REEMBED_LOG_FILENAME = "reembed.log"
+SOCKET_FILENAME = "daemon.sock"
+
+# Concurrent writers (parallel agents). A sync waits up to SYNC_WAIT_TIMEOUT
+# seconds for one running in another process, then picks up what it left;
+# any other write waits up to DB_BUSY_TIMEOUT seconds for SQLite's lock.
+SYNC_WAIT_TIMEOUT = float(os.environ.get("FORGE_SYNC_WAIT", "300"))
+DB_BUSY_TIMEOUT = float(os.environ.get("FORGE_DB_BUSY_TIMEOUT", "10"))
+
+# Daemon (forge-memory serve)
+DAEMON_IDLE_TIMEOUT = float(os.environ.get("FORGE_DAEMON_IDLE_TIMEOUT", "3600"))
+DAEMON_DISABLED = os.environ.get("FORGE_NO_DAEMON", "") not in ("", "0")
+
+# Per-stage timing on stderr for search and sync (same as --profile)
+PROFILE = os.environ.get("FORGE_PROFILE", "") not in ("", "0")
+
+# Searches and syncs kept in the telemetry table (0 = record nothing)
+TELEMETRY_MAX_ROWS = int(os.environ.get("FORGE_TELEMETRY_ROWS", "20000"))
 
 # Additional directories to scan (relative to project root)
 EXTRA_SCAN_DIRS = ["docs"]
 
 
+def onnx_model_dir(model_name: str) -> str:
+    """Return the directory holding the ONNX export of *model_name*.
+
+    ``FORGE_ONNX_MODEL_DIR`` only locates the configured model's export;
+    other models (the one an index is still being re-embedded from) are
+    looked up where ``forge-memory export-onnx`` puts them by default.
+    """
+    if model_name == EMBEDDING_MODEL:
+        return ONNX_MODEL_DIR
+    return os.path.join(_ONNX_MODELS_DIR, f"{model_name}-onnx-int8")
+
+
 def get_memory_dir(project_root: str) -> str:
     """Return absolute path to the .forge/memory/ directory."""
     return os.path.join(project_root, MEMORY_DIR)
@@ -33,6 +116,21 @@ def get_db_path(project_root: str) -> str:
     return os.path.join(project_root, MEMORY_DIR, DB_FILENAME)
 
 
+def get_socket_path(project_root: str) -> str:
+    """Return absolute path to the daemon's Unix domain socket.
+
+    Falls back to a per-project path in the temp directory when the default
+    location would exceed the platform's socket path length limit.
+    """
+    path = os.path.join(project_root, MEMORY_DIR, SOCKET_FILENAME)
+    if len(path.encode()) < 100:
+        return path
+    import hashlib
+    import tempfile
+    digest = hashlib.sha1(os.path.abspath(project_root).encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"forge-memory-{digest}.sock")
+
+
 def get_extra_scan_dirs(project_root: str) -> list[str]:
     """Return absolute paths to extra directories to scan for markdown files."""
     dirs = []
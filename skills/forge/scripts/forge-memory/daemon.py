@@ -0,0 +1,274 @@
+"""FORGE Vector Memory — Warm daemon over a Unix domain socket.
+
+``forge-memory serve`` keeps the embedding model, an open database connection
+and the search pipeline loaded in a single long-lived process. CLI commands
+call :func:`request` first and fall back to in-process execution when no
+daemon is listening.
+
+Protocol: the client sends one JSON line ``{"command": ..., "params": {...}}``
+and reads back one JSON line ``{"ok": true, "result": ..., "output": "..."}``
+(or ``{"ok": false, "error": "..."}``). With ``"profile": true`` in the
+request, the reply also carries the :mod:`timing` report of the command.
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+from typing import Any
+
+import timing
+from config import (
+    DAEMON_DISABLED,
+    DAEMON_IDLE_TIMEOUT,
+    get_db_path,
+    get_socket_path,
+)
+
+# Seconds to wait for the daemon to accept a connection before falling back
+_CONNECT_TIMEOUT = 0.5
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+def request(
+    project_root: str,
+    command: str,
+    params: dict[str, Any] | None = None,
+    *,
+    profile: bool = False,
+) -> dict | None:
+    """Send *command* to the project's daemon and return its reply.
+
+    Returns ``None`` when no daemon is running (or daemons are disabled via
+    ``FORGE_NO_DAEMON``), so callers can fall back to in-process execution.
+    With *profile*, the reply has a ``profile`` key holding the daemon-side
+    :meth:`timing.Profile.report`.
+    """
+    if DAEMON_DISABLED or not hasattr(socket, "AF_UNIX"):
+        return None
+
+    sock_path = get_socket_path(project_root)
+    if not os.path.exists(sock_path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(_CONNECT_TIMEOUT)
+        try:
+            sock.connect(sock_path)
+        except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+            return None
+        # Commands such as sync can legitimately take a while
+        sock.settimeout(None)
+        message: dict[str, Any] = {"command": command, "params": params or {}}
+        if profile:
+            message["profile"] = True
+        payload = json.dumps(message)
+        sock.sendall(payload.encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def is_running(project_root: str) -> bool:
+    """Return True if a daemon answers on the project's socket."""
+    reply = request(project_root, "ping")
+    return bool(reply and reply.get("ok"))
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _State:
+    """Long-lived resources shared by every request served by the daemon."""
+
+    def __init__(self, project_root: str) -> None:
+        self.project_root = project_root
+        self.db_path = get_db_path(project_root)
+        self.db = None
+        self._db_ino: int | None = None
+        self.running = True
+
+    def connection(self):
+        """Return the shared connection, reopening it if the file was replaced.
+
+        ``forge-memory reset`` deletes and recreates the database file; the
+        old connection would otherwise keep reading the unlinked inode.
+        """
+        from db import init_db
+
+        try:
+            ino = os.stat(self.db_path).st_ino
+        except FileNotFoundError:
+            ino = None
+        if self.db is None or ino != self._db_ino:
+            if self.db is not None:
+                self.db.close()
+            self.db = init_db(self.db_path)
+            self._db_ino = os.stat(self.db_path).st_ino
+        return self.db
+
+    def abandon(self) -> None:
+        """Roll back what a failed request left open on the shared connection.
+
+        A connection that cannot even roll back is dropped, to be reopened
+        by the next request.
+        """
+        if self.db is None or not self.db.in_transaction:
+            return
+        try:
+            self.db.rollback()
+        except Exception:
+            self.close()
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def _dispatch(state: _State, command: str, params: dict[str, Any]) -> Any:
+    """Run *command* against the warm state and return a JSON-able result."""
+    if command == "ping":
+        return {"pid": os.getpid()}
+
+    if command == "shutdown":
+        state.running = False
+        return {"pid": os.getpid()}
+
+    if command == "search":
+        from search import search
+
+        return search(state.project_root, db=state.connection(), **params)
+
+    if command == "search_batch":
+        from search import search_batch
+
+        return list(search_batch(state.project_root, db=state.connection(), **params))
+
+    if command == "sync":
+        from sync import sync
+
+        return sync(state.project_root, db=state.connection(), **params)
+
+    raise ValueError(f"Unknown command: {command}")
+
+
+def _handle(state: _State, conn: socket.socket) -> str | None:
+    """Read one request from *conn*, execute it and write the reply.
+
+    Returns the command name (``None`` if the client sent nothing).
+    """
+    command = None
+    with conn, conn.makefile("rb") as reader:
+        line = reader.readline()
+        if not line:
+            return None
+        output = io.StringIO()
+        try:
+            req = json.loads(line)
+            command = req.get("command", "")
+            with contextlib.redirect_stdout(output), \
+                    timing.profiling(command, bool(req.get("profile"))) as profile:
+                result = _dispatch(state, command, req.get("params") or {})
+            reply = {"ok": True, "result": result, "output": output.getvalue()}
+            if profile is not None:
+                reply["profile"] = {**profile.report(), "daemon": True}
+        except Exception as exc:  # Report every failure back to the client
+            state.abandon()
+            reply = {"ok": False, "error": f"{type(exc).__name__}: {exc}",
+                     "output": output.getvalue()}
+        try:
+            conn.sendall(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+    return command
+
+
+def serve(
+    project_root: str,
+    *,
+    idle_timeout: float = DAEMON_IDLE_TIMEOUT,
+    verbose: bool = False,
+) -> None:
+    """Serve requests for *project_root* until shutdown or idle timeout.
+
+    Requests are handled one at a time, so the shared SQLite connection is
+    never used concurrently.
+
+    Parameters
+    ----------
+    project_root:
+        Absolute path to the project root containing .forge/memory/.
+    idle_timeout:
+        Exit after this many seconds without a request (``0`` = never).
+    verbose:
+        If ``True``, print one line per request.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("forge-memory serve requires Unix domain sockets.")
+
+    sock_path = get_socket_path(project_root)
+    if is_running(project_root):
+        raise RuntimeError(f"A daemon is already listening on {sock_path}")
+    # Left behind by a daemon that did not exit cleanly
+    if os.path.exists(sock_path):
+        os.remove(sock_path)
+
+    state = _State(project_root)
+    state.connection()
+
+    # Load the model up front so the first request is already warm
+    from embedder import _get_backend
+
+    _get_backend()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    os.chmod(sock_path, 0o600)
+    server.listen(16)
+    server.settimeout(idle_timeout or None)
+
+    def _stop(_signum, _frame):
+        state.running = False
+        server.close()
+
+    signal.signal(signal.SIGTERM, _stop)
+
+    if verbose:
+        print(f"forge-memory daemon listening on {sock_path} (pid {os.getpid()})", flush=True)
+
+    try:
+        while state.running:
+            try:
+                conn, _addr = server.accept()
+            except socket.timeout:
+                if verbose:
+                    print("Idle timeout reached, shutting down.", flush=True)
+                break
+            except OSError:
+                # Socket closed by the SIGTERM handler
+                break
+            conn.settimeout(None)
+            command = _handle(state, conn)
+            if verbose and command:
+                print(f"  {command}", flush=True)
+    finally:
+        server.close()
+        state.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(sock_path)
@@ -1,14 +1,96 @@
 """FORGE Vector Memory — SQLite schema with sqlite-vec and FTS5."""
-import sqlite3
+from __future__ import annotations
 
-import sqlite_vec
+import contextlib
+import fcntl
+import os
+import sqlite3
+import time
+from typing import Callable, Iterator
 
-from config import EMBEDDING_DIM, EMBEDDING_MODEL
+import timing
+from chunker import text_hash
+from config import (
+    DB_BUSY_TIMEOUT,
+    EMBEDDING_DIM,
+    MODEL_ID,
+    SYNC_LOCK_FILENAME,
+    VECTOR_QUANTIZATION,
+)
 
 # ---------------------------------------------------------------------------
 # Schema SQL
 # ---------------------------------------------------------------------------
 
+# FTS5 synchronisation triggers, by name; kept separate so bulk_load() can
+# drop and recreate them
+_FTS_TRIGGERS = {
+    "chunks_ai": """
+CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts(rowid, text, heading)
+    VALUES (new.id, new.text, new.heading);
+END""",
+    "chunks_ad": """
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, text, heading)
+    VALUES ('delete', old.id, old.text, old.heading);
+END""",
+    "chunks_au": """
+CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE OF text, heading ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, text, heading)
+    VALUES ('delete', old.id, old.text, old.heading);
+    INSERT INTO chunks_fts(rowid, text, heading)
+    VALUES (new.id, new.text, new.heading);
+END""",
+}
+
+# SQL expression turning a float32 vector parameter into the stored form,
+# for each FORGE_VECTOR_QUANTIZATION setting
+_VEC_QUANTIZE = {
+    "float": "?",
+    "int8": "vec_quantize_int8(?, 'unit')",
+    "bit": "vec_quantize_binary(?)",
+}
+if VECTOR_QUANTIZATION not in _VEC_QUANTIZE:
+    raise ValueError(
+        f"FORGE_VECTOR_QUANTIZATION must be one of {', '.join(_VEC_QUANTIZE)}, "
+        f"not {VECTOR_QUANTIZATION!r}"
+    )
+
+# Placeholder for a float32 embedding blob compared with or stored in a
+# vector table
+VEC_PARAM_SQL = _VEC_QUANTIZE[VECTOR_QUANTIZATION]
+
+# Name of the vector table of a new index. The live table is recorded in
+# meta.vec_table, since re-embedding with another model builds a new one.
+DEFAULT_VEC_TABLE = "chunks_vec"
+
+
+def vec_table_sql(name: str, dim: int) -> str:
+    """Return the DDL of a vector table in the configured storage format.
+
+    Namespace is a partition key and agent/file_id are metadata columns, so
+    search filters are applied inside the KNN rather than after it. vec0
+    metadata cannot be NULL: a file without an agent is stored as ''.
+    """
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING vec0(
+    chunk_id INTEGER PRIMARY KEY,
+    namespace TEXT PARTITION KEY,
+    embedding {VECTOR_QUANTIZATION}[{dim}],
+    agent TEXT,
+    file_id INTEGER
+)"""
+
+
+def vec_insert_sql(name: str) -> str:
+    """Return the INSERT for *name*, taking a float32 embedding blob."""
+    return (
+        f"INSERT INTO {name} (chunk_id, embedding, namespace, agent, file_id) "
+        f"VALUES (?, {VEC_PARAM_SQL}, ?, ?, ?)"
+    )
+
+
 _SCHEMA_SQL = f"""
 PRAGMA journal_mode = WAL;
 PRAGMA foreign_keys = ON;
@@ -21,7 +103,10 @@ CREATE TABLE IF NOT EXISTS files (
     namespace TEXT NOT NULL,
     agent TEXT,
     mtime REAL NOT NULL,
+    mtime_ns INTEGER,
+    inode INTEGER,
     hash TEXT NOT NULL,
+    size INTEGER,
     chunk_count INTEGER DEFAULT 0,
     indexed_at TEXT DEFAULT (datetime('now'))
 );
@@ -35,15 +120,25 @@ CREATE TABLE IF NOT EXISTS chunks (
     end_line INTEGER NOT NULL,
     heading TEXT,
     token_count INTEGER NOT NULL,
-    embedding BLOB NOT NULL
+    text_hash TEXT
 );
 
--- Vector index (sqlite-vec) -------------------------------------------------
+-- Change manifest: directory mtimes from the last sync ----------------------
 
-CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vec USING vec0(
-    chunk_id INTEGER PRIMARY KEY,
-    embedding float[{EMBEDDING_DIM}]
-);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Content-addressed embedding cache: one vector per (model, chunk text) ---
+-- Also the full-precision copy of every indexed chunk's vector.
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
 
 -- Full-text search (FTS5) ---------------------------------------------------
 
@@ -54,23 +149,7 @@ CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
 );
 
 -- FTS5 synchronisation triggers ---------------------------------------------
-
-CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
-    INSERT INTO chunks_fts(rowid, text, heading)
-    VALUES (new.id, new.text, new.heading);
-END;
-
-CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
-    INSERT INTO chunks_fts(chunks_fts, rowid, text, heading)
-    VALUES ('delete', old.id, old.text, old.heading);
-END;
-
-CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE ON chunks BEGIN
-    INSERT INTO chunks_fts(chunks_fts, rowid, text, heading)
-    VALUES ('delete', old.id, old.text, old.heading);
-    INSERT INTO chunks_fts(rowid, text, heading)
-    VALUES (new.id, new.text, new.heading);
-END;
+{";".join(_FTS_TRIGGERS.values())};
 
 -- Metadata ------------------------------------------------------------------
 
@@ -78,22 +157,241 @@ CREATE TABLE IF NOT EXISTS meta (
     key TEXT PRIMARY KEY,
     value TEXT NOT NULL
 );
+
+-- Telemetry: timings of recent syncs and searches (see telemetry.py) --------
+
+CREATE TABLE IF NOT EXISTS telemetry (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    command TEXT NOT NULL,
+    total_ms REAL NOT NULL,
+    stages TEXT NOT NULL,
+    counters TEXT NOT NULL
+);
+
+-- Search result cache, stamped with meta.generation (see result_cache.py) --
+
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    results TEXT NOT NULL,
+    used REAL NOT NULL,
+    scope TEXT,
+    query TEXT,
+    embedding BLOB
+) WITHOUT ROWID;
+"""
+
+# Indexes on columns that may have been added by a migration, so they can
+# only be created once migrations have run.
+_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_chunks_text_hash ON chunks(text_hash);
+CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks(file_id, chunk_index);
 """
 
+SCHEMA_VERSION = 8
+
+# Page cache used while bulk loading (negative = KiB, see PRAGMA cache_size)
+_BULK_CACHE_SIZE = -65536
+
+# Seconds between attempts to take a writer lock held by another process
+_LOCK_POLL = 0.05
+
 _META_DEFAULTS = {
-    "schema_version": "1",
-    "embedding_model": EMBEDDING_MODEL,
+    "schema_version": str(SCHEMA_VERSION),
+    "embedding_model": MODEL_ID,
     "embedding_dim": str(EMBEDDING_DIM),
+    "vec_table": DEFAULT_VEC_TABLE,
+    "generation": "0",
 }
 
 
+# ---------------------------------------------------------------------------
+# Migrations
+# ---------------------------------------------------------------------------
+
+def _columns(db: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_v2(db: sqlite3.Connection) -> None:
+    """Add ``chunks.text_hash`` and seed the embedding cache from stored vectors."""
+    if "text_hash" not in _columns(db, "chunks"):
+        db.execute("ALTER TABLE chunks ADD COLUMN text_hash TEXT")
+
+    model = db.execute(
+        "SELECT value FROM meta WHERE key = 'embedding_model'"
+    ).fetchone()[0]
+    rows = db.execute(
+        "SELECT id, text, embedding FROM chunks WHERE text_hash IS NULL"
+    ).fetchall()
+    for row in rows:
+        digest = text_hash(row["text"])
+        db.execute("UPDATE chunks SET text_hash = ? WHERE id = ?", (digest, row["id"]))
+        db.execute(
+            "INSERT OR IGNORE INTO embedding_cache (model, text_hash, embedding) "
+            "VALUES (?, ?, ?)",
+            (model, digest, row["embedding"]),
+        )
+
+
+def _migrate_v3(db: sqlite3.Connection) -> None:
+    """Only resync FTS when a chunk's text or heading changes.
+
+    Incremental re-indexing updates chunk positions in place; the original
+    trigger fired on any UPDATE and rewrote the FTS entry every time.
+    """
+    db.execute("DROP TRIGGER IF EXISTS chunks_au")
+    db.execute("""
+        CREATE TRIGGER chunks_au AFTER UPDATE OF text, heading ON chunks BEGIN
+            INSERT INTO chunks_fts(chunks_fts, rowid, text, heading)
+            VALUES ('delete', old.id, old.text, old.heading);
+            INSERT INTO chunks_fts(rowid, text, heading)
+            VALUES (new.id, new.text, new.heading);
+        END
+    """)
+
+
+def _migrate_v4(db: sqlite3.Connection) -> None:
+    """Record the indexed byte length of each file for append detection.
+
+    Existing rows keep ``size = NULL`` and are re-indexed normally once.
+    """
+    if "size" not in _columns(db, "files"):
+        db.execute("ALTER TABLE files ADD COLUMN size INTEGER")
+
+
+def _migrate_v5(db: sqlite3.Connection) -> None:
+    """Store (mtime_ns, inode) so unchanged files can be skipped without hashing."""
+    cols = _columns(db, "files")
+    if "mtime_ns" not in cols:
+        db.execute("ALTER TABLE files ADD COLUMN mtime_ns INTEGER")
+    if "inode" not in cols:
+        db.execute("ALTER TABLE files ADD COLUMN inode INTEGER")
+
+
+def _migrate_v6(db: sqlite3.Connection) -> None:
+    """Recreate ``chunks_vec`` with namespace/agent/file_id filter columns."""
+    rows = db.execute(
+        """SELECT v.chunk_id, v.embedding, f.namespace, COALESCE(f.agent, ''), c.file_id
+           FROM chunks_vec v
+           JOIN chunks c ON c.id = v.chunk_id
+           JOIN files f ON f.id = c.file_id"""
+    ).fetchall()
+    dim = db.execute("SELECT value FROM meta WHERE key = 'embedding_dim'").fetchone()[0]
+    db.execute("DROP TABLE chunks_vec")
+    db.execute(vec_table_sql("chunks_vec", int(dim)))
+    db.executemany(vec_insert_sql("chunks_vec"), [tuple(row) for row in rows])
+
+
+def _migrate_v7(db: sqlite3.Connection) -> None:
+    """Drop ``chunks.embedding``; the embedding cache holds the float copy."""
+    if "embedding" not in _columns(db, "chunks"):
+        return
+    model = db.execute(
+        "SELECT value FROM meta WHERE key = 'embedding_model'"
+    ).fetchone()[0]
+    db.execute(
+        "INSERT OR IGNORE INTO embedding_cache (model, text_hash, embedding) "
+        "SELECT ?, text_hash, embedding FROM chunks",
+        (model,),
+    )
+    db.execute("ALTER TABLE chunks DROP COLUMN embedding")
+
+
+def _migrate_v8(db: sqlite3.Connection) -> None:
+    """Store the query and its vector with cached results, for near-duplicates."""
+    cols = _columns(db, "search_cache")
+    for col, sql_type in (("scope", "TEXT"), ("query", "TEXT"), ("embedding", "BLOB")):
+        if col not in cols:
+            db.execute(f"ALTER TABLE search_cache ADD COLUMN {col} {sql_type}")
+
+
+_MIGRATIONS = [
+    (2, _migrate_v2),
+    (3, _migrate_v3),
+    (4, _migrate_v4),
+    (5, _migrate_v5),
+    (6, _migrate_v6),
+    (7, _migrate_v7),
+    (8, _migrate_v8),
+]
+
+
+def _migrate(db: sqlite3.Connection) -> None:
+    """Bring an existing database up to :data:`SCHEMA_VERSION`."""
+    version = int(db.execute(
+        "SELECT value FROM meta WHERE key = 'schema_version'"
+    ).fetchone()[0])
+    for target, step in _MIGRATIONS:
+        if version < target:
+            step(db)
+            db.execute(
+                "UPDATE meta SET value = ? WHERE key = 'schema_version'",
+                (str(target),),
+            )
+            version = target
+
+
+def _rebuild_vec_table(db: sqlite3.Connection) -> None:
+    """Recreate the live vector table in the configured storage format.
+
+    Vectors are re-quantized from the full-precision copies in the
+    embedding cache. An unfinished re-embedding is restarted, since its
+    table was built in the previous format.
+    """
+    meta = get_meta(db)
+    table = meta["vec_table"]
+    rows = db.execute(
+        """SELECT c.id, e.embedding, f.namespace, COALESCE(f.agent, ''), c.file_id
+           FROM chunks c
+           JOIN files f ON f.id = c.file_id
+           JOIN embedding_cache e ON e.model = ? AND e.text_hash = c.text_hash""",
+        (meta["embedding_model"],),
+    ).fetchall()
+    db.execute(f"DROP TABLE IF EXISTS {table}")
+    db.execute(vec_table_sql(table, int(meta["embedding_dim"])))
+    db.executemany(vec_insert_sql(table), [tuple(row) for row in rows])
+    if meta.get("reembed_table"):
+        db.execute(f"DROP TABLE IF EXISTS {meta['reembed_table']}")
+        db.execute("DELETE FROM meta WHERE key LIKE 'reembed_%'")
+    db.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('vector_quantization', ?)",
+        (VECTOR_QUANTIZATION,),
+    )
+    bump_generation(db)
+
+
+def _adopt_model_if_empty(db: sqlite3.Connection) -> None:
+    """Switch an index without chunks straight to the configured model."""
+    meta = get_meta(db)
+    if (meta["embedding_model"], int(meta["embedding_dim"])) == (MODEL_ID, EMBEDDING_DIM):
+        return
+    if db.execute("SELECT 1 FROM chunks LIMIT 1").fetchone():
+        return
+    db.execute(f"DROP TABLE IF EXISTS {meta['vec_table']}")
+    if meta.get("reembed_table"):
+        db.execute(f"DROP TABLE IF EXISTS {meta['reembed_table']}")
+        db.execute("DELETE FROM meta WHERE key LIKE 'reembed_%'")
+    db.execute(vec_table_sql(meta["vec_table"], EMBEDDING_DIM))
+    db.executemany(
+        "UPDATE meta SET value = ? WHERE key = ?",
+        [(MODEL_ID, "embedding_model"), (str(EMBEDDING_DIM), "embedding_dim")],
+    )
+    bump_generation(db)
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
 def get_connection(db_path: str) -> sqlite3.Connection:
     """Open a connection with sqlite-vec loaded and WAL mode enabled."""
-    db = sqlite3.connect(db_path)
+    # The sqlite_vec package imports numpy; keep it out of module load time
+    import sqlite_vec
+
+    # Writers wait this long for each other; readers never wait in WAL mode
+    db = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT)
     db.enable_load_extension(True)
     sqlite_vec.load(db)
     db.enable_load_extension(False)
@@ -111,11 +409,166 @@ def init_db(db_path: str) -> sqlite3.Connection:
     db = get_connection(db_path)
     db.executescript(_SCHEMA_SQL)
 
-    # Insert meta defaults (ignore if already present)
-    for key, value in _META_DEFAULTS.items():
-        db.execute(
-            "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
-            (key, value),
-        )
+    # Only write what is missing: on an up-to-date index, opening it must
+    # not wait for the write lock a running sync holds
+    missing = {key: value for key, value in _META_DEFAULTS.items()
+               if key not in get_meta(db)}
+    db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", missing.items())
+    _migrate(db)
+    db.executescript(_INDEX_SQL)
+
+    meta = get_meta(db)
+    if not db.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (meta["vec_table"],),
+    ).fetchone():
+        db.execute(vec_table_sql(meta["vec_table"], int(meta["embedding_dim"])))
+    _adopt_model_if_empty(db)
+
+    # Indexes from before quantization support have no key and store floats
+    if meta.get("vector_quantization", "float") != VECTOR_QUANTIZATION:
+        _rebuild_vec_table(db)
     db.commit()
     return db
+
+
+def get_meta(db: sqlite3.Connection) -> dict[str, str]:
+    """Return the ``meta`` table as a dict."""
+    return {row[0]: row[1] for row in db.execute("SELECT key, value FROM meta")}
+
+
+def index_model(db: sqlite3.Connection) -> tuple[str, str]:
+    """Return ``(model id, vector table)`` of the vectors searches use.
+
+    This is the model the index was built with, which differs from the
+    configured :data:`config.MODEL_ID` while a re-embedding is running.
+    """
+    meta = get_meta(db)
+    return meta["embedding_model"], meta["vec_table"]
+
+
+def generation(db: sqlite3.Connection) -> int:
+    """Return the index generation, which changes whenever search results may.
+
+    Read it in the same transaction as the search it stamps.
+    """
+    return int(db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+
+def bump_generation(db: sqlite3.Connection) -> None:
+    """Mark the index as changed, in the caller's write transaction."""
+    db.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+
+def write_if_free(db: sqlite3.Connection, write: Callable[[sqlite3.Connection], None]) -> bool:
+    """Run *write* in a transaction of its own, unless that means waiting.
+
+    For bookkeeping that a command should never wait for (telemetry, the
+    search cache): the transaction does not wait for the write lock and is
+    not synced to disk. Returns ``False``, with nothing written, if another
+    connection holds the write lock or the caller has a transaction open.
+    """
+    # Never commit a transaction the caller opened
+    if db.in_transaction:
+        return False
+    busy_timeout = db.execute("PRAGMA busy_timeout").fetchone()[0]
+    synchronous = db.execute("PRAGMA synchronous").fetchone()[0]
+    db.execute("PRAGMA busy_timeout = 0")
+    # Losing the last rows on power failure is fine; an fsync per search is not
+    db.execute("PRAGMA synchronous = OFF")
+    try:
+        write(db)
+        db.commit()
+        return True
+    except sqlite3.OperationalError:
+        db.rollback()
+        return False
+    finally:
+        db.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        db.execute(f"PRAGMA synchronous = {synchronous}")
+
+
+def vec_tables(db: sqlite3.Connection) -> list[str]:
+    """Return every vector table holding rows for the current chunks.
+
+    That is the live table plus, during a re-embedding, the table being
+    built; deleted chunks must be removed from both.
+    """
+    meta = get_meta(db)
+    return [meta["vec_table"]] + ([meta["reembed_table"]] if meta.get("reembed_table") else [])
+
+
+@contextlib.contextmanager
+def writer_lock(db_path: str, timeout: float | None = None) -> Iterator[bool]:
+    """Hold the index's writer lock for the duration of the block.
+
+    Syncs and re-embedding batches take this advisory lock (``sync.lock``
+    next to the database) around their embedding and writing, so only one
+    process indexes at a time. Searches do not take it: they keep reading
+    the last committed snapshot.
+
+    Yields ``True`` if another process held the lock and was waited for.
+
+    Raises
+    ------
+    TimeoutError
+        If the lock is still held after *timeout* seconds (``None`` waits
+        as long as it takes, ``0`` not at all).
+    """
+    path = os.path.join(os.path.dirname(db_path), SYNC_LOCK_FILENAME)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        waited = False
+        with timing.stage("lock_wait"):
+            started = time.monotonic()
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if timeout is not None and time.monotonic() - started >= timeout:
+                        raise TimeoutError(
+                            f"The index is being written by another process ({path})"
+                        ) from None
+                    waited = True
+                    time.sleep(_LOCK_POLL)
+        yield waited
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def bulk_load(db: sqlite3.Connection) -> Iterator[None]:
+    """Load many chunks at once, as for ``sync --force`` or a first sync.
+
+    The FTS5 triggers are dropped for the duration of the block and
+    ``chunks_fts`` is repopulated with a single ``'rebuild'`` at the end,
+    instead of one FTS write per inserted or deleted chunk. Durability is
+    relaxed and the page cache enlarged while loading.
+
+    The block runs in its own transaction, committed on exit. If the block
+    raises, it is rolled back, triggers included.
+    """
+    # The safety level cannot be changed inside a transaction
+    db.commit()
+    synchronous = db.execute("PRAGMA synchronous").fetchone()[0]
+    cache_size = db.execute("PRAGMA cache_size").fetchone()[0]
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute(f"PRAGMA cache_size = {_BULK_CACHE_SIZE}")
+    try:
+        db.execute("BEGIN")
+        for name in _FTS_TRIGGERS:
+            db.execute(f"DROP TRIGGER IF EXISTS {name}")
+        try:
+            yield
+        except BaseException:
+            db.rollback()
+            raise
+        with timing.stage("fts_rebuild"):
+            db.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+        for sql in _FTS_TRIGGERS.values():
+            db.execute(sql)
+        db.commit()
+    finally:
+        db.execute(f"PRAGMA synchronous = {synchronous}")
+        db.execute(f"PRAGMA cache_size = {cache_size}")
@@ -0,0 +1,118 @@
+"""FORGE Vector Memory — Content-addressed embedding cache.
+
+Vectors are stored in the ``embedding_cache`` table keyed by
+``(model id, SHA-256 of the chunk text)``, so a piece of text that has been
+embedded once is never sent through the model again, whichever file or
+position it ends up in.
+"""
+from __future__ import annotations
+
+import sqlite3
+
+import timing
+from config import EMBED_BATCH_SIZE, MODEL_ID
+
+# Max host parameters per IN (...) query (SQLite < 3.32 allows 999)
+_LOOKUP_BATCH = 500
+
+
+def lookup(
+    db: sqlite3.Connection,
+    hashes: list[str],
+    model: str = MODEL_ID,
+) -> dict[str, bytes]:
+    """Return cached embeddings for the given text hashes (misses are absent)."""
+    found: dict[str, bytes] = {}
+    unique = list(dict.fromkeys(hashes))
+    for start in range(0, len(unique), _LOOKUP_BATCH):
+        batch = unique[start:start + _LOOKUP_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        rows = db.execute(
+            f"SELECT text_hash, embedding FROM embedding_cache "
+            f"WHERE model = ? AND text_hash IN ({placeholders})",
+            (model, *batch),
+        ).fetchall()
+        for row in rows:
+            found[row["text_hash"]] = row["embedding"]
+    return found
+
+
+def store(db: sqlite3.Connection, items: dict[str, bytes], model: str = MODEL_ID) -> None:
+    """Insert freshly computed embeddings keyed by text hash."""
+    timing.count("cache_rows_written", len(items))
+    db.executemany(
+        "INSERT OR REPLACE INTO embedding_cache (model, text_hash, embedding) "
+        "VALUES (?, ?, ?)",
+        [(model, h, blob) for h, blob in items.items()],
+    )
+
+
+def embed(
+    db: sqlite3.Connection,
+    texts: list[str],
+    hashes: list[str],
+    model: str = MODEL_ID,
+    *,
+    fresh: dict[str, bytes] | None = None,
+) -> tuple[list[bytes], int]:
+    """Return one embedding blob per text, encoding only cache misses.
+
+    Parameters
+    ----------
+    db:
+        Open connection holding the ``embedding_cache`` table.
+    texts:
+        Chunk texts to embed.
+    hashes:
+        :func:`chunker.text_hash` of each text, in the same order.
+    model:
+        Model id to embed with (defaults to the configured one).
+    fresh:
+        If given, newly encoded embeddings are added to it by text hash
+        instead of being written to the cache, for the caller to
+        :func:`store` later (e.g. once it holds the write lock).
+
+    Returns
+    -------
+    ``(blobs, encoded)`` where *encoded* is the number of texts that actually
+    went through the model.
+    """
+    cached = lookup(db, hashes, model)
+
+    # De-duplicate misses so repeated text is encoded once
+    missing: dict[str, str] = {}
+    for text, digest in zip(texts, hashes):
+        if digest not in cached and digest not in missing:
+            missing[digest] = text
+
+    if missing:
+        # Imported here so fully cached syncs never load the model
+        from embedder import encode_batch
+
+        # Sorting by length keeps texts of similar size in the same batch,
+        # so little of each forward pass is spent on padding
+        order = sorted(missing, key=lambda digest: len(missing[digest]))
+        encoded: dict[str, bytes] = {}
+        for start in range(0, len(order), EMBED_BATCH_SIZE):
+            batch = order[start:start + EMBED_BATCH_SIZE]
+            blobs = encode_batch([missing[digest] for digest in batch], len(batch), model)
+            encoded.update(zip(batch, blobs))
+        if fresh is None:
+            store(db, encoded, model)
+        else:
+            fresh.update(encoded)
+        cached.update(encoded)
+
+    return [cached[digest] for digest in hashes], len(missing)
+
+
+def evict(db: sqlite3.Connection) -> int:
+    """Delete cache entries whose text no longer appears in any chunk.
+
+    Returns the number of evicted entries.
+    """
+    cur = db.execute(
+        "DELETE FROM embedding_cache WHERE NOT EXISTS "
+        "(SELECT 1 FROM chunks c WHERE c.text_hash = embedding_cache.text_hash)"
+    )
+    return cur.rowcount
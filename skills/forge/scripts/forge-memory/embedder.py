@@ -1,12 +1,29 @@
-"""FORGE Vector Memory — Sentence-transformers embedding pipeline.
+"""FORGE Vector Memory — Embedding pipeline with pluggable backends.
 
-Uses a singleton pattern to load the model once and reuse it across calls.
+The backend is chosen with ``FORGE_EMBEDDING_BACKEND``:
+
+- ``sentence-transformers`` (default): the reference implementation, which
+  needs torch.
+- ``onnx``: ONNX Runtime running an int8-quantized export of the same model
+  (see :mod:`onnx_export`). It only needs ``onnxruntime`` and ``tokenizers``,
+  starts much faster and uses a fraction of the memory on CPU.
+- ``hash``: a deterministic stand-in that hashes words into vectors. It
+  needs no model or network and is used by ``forge-memory bench`` to
+  measure everything but the model.
+
+Uses a singleton pattern to load the backend once and reuse it across
+calls. Backend libraries are only imported when the model is first needed,
+so importing this module stays cheap.
 """
 from __future__ import annotations
 
+import hashlib
+import json
 import os
+import re
 import threading
 import warnings
+from typing import Protocol
 
 # Suppress known harmless warnings from HuggingFace / transformers
 os.environ.setdefault("HF_HUB_DISABLE_TELEMETRY", "1")
@@ -15,80 +32,358 @@ warnings.filterwarnings("ignore", message=".*position_ids.*")
 warnings.filterwarnings("ignore", message=".*unauthenticated.*HF Hub.*")
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-from config import EMBEDDING_DIM, EMBEDDING_MODEL
+import timing
+from config import EMBED_BATCH_SIZE, EMBEDDING_DIM, MODEL_ID, onnx_model_dir
+
+# Files written by onnx_export next to the quantized model
+ONNX_MODEL_FILE = "model_int8.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+ONNX_CONFIG_FILE = "forge_onnx.json"
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class Backend(Protocol):
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        """Return float32 embeddings of shape ``(len(texts), dim)``."""
+        ...
+
+
+class SentenceTransformersBackend:
+    """Reference backend: sentence-transformers on torch."""
+
+    def __init__(self, model_name: str) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        return embeddings.astype(np.float32)
+
+
+def _onnx_settings(model_name: str, model_dir: str) -> dict:
+    """Read the settings onnx_export saved next to the model in *model_dir*."""
+    with open(os.path.join(model_dir, ONNX_CONFIG_FILE), encoding="utf-8") as f:
+        settings = json.load(f)
+    if settings["model"] != model_name:
+        raise ValueError(
+            f"The ONNX model in {model_dir} is an export of {settings['model']}, "
+            f"not {model_name}. Re-run 'forge-memory export-onnx'."
+        )
+    return settings
+
+
+class OnnxBackend:
+    """ONNX Runtime backend for an int8-quantized export of the model.
+
+    Reproduces the sentence-transformers pipeline of the exported model:
+    tokenize, run the transformer, mean-pool over the attention mask and,
+    if the original model did, L2-normalise.
+    """
+
+    def __init__(self, model_name: str, model_dir: str | None = None) -> None:
+        model_dir = model_dir or onnx_model_dir(model_name)
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"No ONNX model at {model_path}. Run 'forge-memory export-onnx' first."
+            )
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        settings = _onnx_settings(model_name, model_dir)
+        self.normalize = settings["normalize"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, ONNX_TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=settings["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=settings["pad_token_id"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        out = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]
+
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if self.normalize:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            out.append(pooled.astype(np.float32))
+        return np.concatenate(out) if out else np.empty((0, 0), dtype=np.float32)
+
+
+class HashBackend:
+    """Deterministic stand-in: feature hashing of words, L2-normalised.
+
+    Texts sharing words get similar vectors, so searches still return
+    sensible results, but nothing is downloaded or loaded. The width comes
+    from the model name, ``hash:<dim>``, so the vectors of an index being
+    re-embedded to another width keep the width of its table.
+    """
+
+    _WORD_RE = re.compile(r"\w+")
+
+    def __init__(self, model_name: str) -> None:
+        _, _, width = model_name.partition(":")
+        # Ids written before the width was part of them: the configured one
+        self.dim = int(width) if width.isdigit() else EMBEDDING_DIM
+        self._features: dict[str, tuple[int, float]] = {}
+
+    def _feature(self, word: str) -> tuple[int, float]:
+        feature = self._features.get(word)
+        if feature is None:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            feature = self._features[word] = (bucket, 1.0 if digest[4] & 1 else -1.0)
+        return feature
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in self._WORD_RE.findall(text.lower()):
+                bucket, sign = self._feature(word)
+                out[row, bucket] += sign
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+_BACKENDS: dict[str, type] = {
+    "sentence-transformers": SentenceTransformersBackend,
+    "onnx": OnnxBackend,
+    "hash": HashBackend,
+}
+
 
 # ---------------------------------------------------------------------------
-# Singleton model loader
+# Singleton backend loader
 # ---------------------------------------------------------------------------
 
 _lock = threading.Lock()
-_model: SentenceTransformer | None = None
+_backends: dict[str, Backend] = {}
 
 
-def _get_model() -> SentenceTransformer:
-    """Return the shared SentenceTransformer instance (loaded once)."""
-    global _model
-    if _model is None:
+def _get_backend(model: str = MODEL_ID) -> Backend:
+    """Return the shared backend for a model id (loaded once).
+
+    Model ids are ``<model name>[@<backend>]`` (see :data:`config.MODEL_ID`).
+    More than one can be loaded while an index is being re-embedded: the
+    old model embeds queries, the new one embeds chunks.
+    """
+    backend = _backends.get(model)
+    if backend is None:
         with _lock:
             # Double-checked locking
-            if _model is None:
-                _model = SentenceTransformer(EMBEDDING_MODEL)
-    return _model
+            backend = _backends.get(model)
+            if backend is None:
+                name, _, kind = model.partition("@")
+                kind = kind or "sentence-transformers"
+                try:
+                    factory = _BACKENDS[kind]
+                except KeyError:
+                    raise ValueError(
+                        f"FORGE_EMBEDDING_BACKEND must be one of {', '.join(_BACKENDS)}, "
+                        f"not {kind!r}"
+                    ) from None
+                with timing.stage("model_load"):
+                    backend = _backends[model] = factory(name)
+    return backend
+
+
+# ---------------------------------------------------------------------------
+# Tokenizers
+# ---------------------------------------------------------------------------
+
+class TokenCounter:
+    """Counts a model's input tokens, to size chunks to what it embeds.
+
+    ``budget`` is how many tokens of a text the model reads before
+    truncating: its max sequence length minus the special tokens it adds.
+    """
+
+    def __init__(self, tokenizer, max_length: int) -> None:
+        from tokenizers import Tokenizer
+
+        # A private copy: the model's own tokenizer pads and truncates
+        self._tokenizer = Tokenizer.from_str(tokenizer.to_str())
+        self._tokenizer.no_truncation()
+        self._tokenizer.no_padding()
+        self.budget: int | None = max_length - self._tokenizer.num_special_tokens_to_add(False)
+
+    def count(self, texts: list[str]) -> list[int]:
+        """Return the number of tokens of each text, special tokens excluded."""
+        encodings = self._tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [len(e.ids) for e in encodings]
+
+
+class WordCounter:
+    """Token counter of the ``hash`` backend, which reads whole texts."""
+
+    budget: int | None = None
+
+    def count(self, texts: list[str]) -> list[int]:
+        return [len(HashBackend._WORD_RE.findall(text)) for text in texts]
+
+
+def _downloaded_tokenizer(name: str) -> TokenCounter | None:
+    """Read a sentence-transformers tokenizer from the model's files on disk.
+
+    Only a local model directory or the Hugging Face cache is looked at;
+    ``None`` if the files are not there.
+    """
+    files = ("tokenizer.json", "sentence_bert_config.json")
+    if os.path.isdir(name):
+        paths = [os.path.join(name, f) for f in files]
+    else:
+        try:
+            from huggingface_hub import try_to_load_from_cache
+        except ImportError:
+            return None
+        repo = name if "/" in name else f"sentence-transformers/{name}"
+        paths = [try_to_load_from_cache(repo, f) for f in files]
+    if not all(isinstance(p, str) and os.path.isfile(p) for p in paths):
+        return None
+    from tokenizers import Tokenizer
+
+    with open(paths[1], encoding="utf-8") as f:
+        max_length = json.load(f).get("max_seq_length")
+    if not max_length:
+        return None
+    return TokenCounter(Tokenizer.from_file(paths[0]), max_length)
+
+
+def _load_tokenizer(model: str, load_model: bool) -> TokenCounter | WordCounter | None:
+    name, _, kind = model.partition("@")
+    if kind == "hash":
+        return WordCounter()
+    if kind == "onnx":
+        # Only the tokenizer: no inference session is created
+        from tokenizers import Tokenizer
+
+        model_dir = onnx_model_dir(name)
+        settings = _onnx_settings(name, model_dir)
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, ONNX_TOKENIZER_FILE))
+        return TokenCounter(tokenizer, settings["max_seq_length"])
+    if not load_model and model not in _backends:
+        return _downloaded_tokenizer(name)
+    # sentence-transformers resolves and loads the tokenizer with the model
+    st_model = _get_backend(model).model
+    return TokenCounter(st_model.tokenizer.backend_tokenizer, st_model.max_seq_length)
+
+
+_tokenizer_lock = threading.Lock()
+_tokenizers: dict[str, TokenCounter | WordCounter] = {}
+
+
+def get_tokenizer(
+    model: str = MODEL_ID, *, load_model: bool = True,
+) -> TokenCounter | WordCounter | None:
+    """Return the shared token counter of a model id (loaded once).
+
+    With *load_model* false, a sentence-transformers model that is not
+    loaded yet is never loaded for its tokenizer: the tokenizer is read from
+    the model's downloaded files, or ``None`` is returned if there are none.
+    """
+    counter = _tokenizers.get(model)
+    if counter is None:
+        # Not _lock: loading a sentence-transformers tokenizer loads the model
+        with _tokenizer_lock:
+            counter = _tokenizers.get(model)
+            if counter is None:
+                with timing.stage("tokenizer_load"):
+                    counter = _load_tokenizer(model, load_model)
+                if counter is not None:
+                    _tokenizers[model] = counter
+    return counter
 
 
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
-def encode(texts: list[str]) -> np.ndarray:
+def encode(
+    texts: list[str],
+    batch_size: int | None = None,
+    model: str = MODEL_ID,
+) -> np.ndarray:
     """Encode a batch of texts into float32 embeddings.
 
     Parameters
     ----------
     texts:
         List of strings to encode.
+    batch_size:
+        Texts per forward pass (defaults to ``EMBED_BATCH_SIZE``).
+    model:
+        Model id to encode with (defaults to the configured one).
 
     Returns
     -------
     numpy.ndarray of shape ``(len(texts), EMBEDDING_DIM)`` with dtype float32.
     """
-    model = _get_model()
-    embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
-    return embeddings.astype(np.float32)
+    backend = _get_backend(model)
+    timing.count("texts_encoded", len(texts))
+    return backend.encode(texts, batch_size or EMBED_BATCH_SIZE)
 
 
-def encode_single(text: str) -> bytes:
+def encode_single(text: str, model: str = MODEL_ID) -> bytes:
     """Encode a single text and return raw bytes suitable for SQLite BLOB storage.
 
     Parameters
     ----------
     text:
         The string to encode.
+    model:
+        Model id to encode with (defaults to the configured one).
 
     Returns
     -------
     Raw bytes of the float32 embedding vector.
     """
-    model = _get_model()
-    embedding = model.encode([text], show_progress_bar=False, convert_to_numpy=True)
-    return embedding[0].astype(np.float32).tobytes()
+    return encode([text], 1, model)[0].tobytes()
 
 
-def encode_batch(texts: list[str]) -> list[bytes]:
+def encode_batch(
+    texts: list[str],
+    batch_size: int | None = None,
+    model: str = MODEL_ID,
+) -> list[bytes]:
     """Encode a batch of texts and return a list of raw bytes blobs.
 
     Parameters
     ----------
     texts:
         List of strings to encode.
+    batch_size:
+        Texts per forward pass (defaults to ``EMBED_BATCH_SIZE``).
+    model:
+        Model id to encode with (defaults to the configured one).
 
     Returns
     -------
     List of raw bytes, one per input text.
     """
-    embeddings = encode(texts)
+    embeddings = encode(texts, batch_size, model)
     return [row.tobytes() for row in embeddings]
 
 
@@ -0,0 +1,301 @@
+"""FORGE Vector Memory — Filesystem change manifest.
+
+The ``files`` table stores a stat tuple (size, mtime_ns, inode) per indexed
+file and the ``dirs`` table the mtime of every scanned directory. A single
+:func:`scan` compares the disk against both and returns a :class:`ChangeSet`
+that is shared by the auto-sync freshness check in ``search`` and by
+``sync`` itself, so the trees are walked once per search at most.
+
+Directories whose mtime is unchanged have the same entries as last time and
+are not listed again; their known files are still stat'ed, because writing
+to a file in place does not change its directory's mtime.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict
+
+import timing
+from config import get_extra_scan_dirs, get_memory_dir
+
+
+# ---------------------------------------------------------------------------
+# Types
+# ---------------------------------------------------------------------------
+
+class FileInfo(TypedDict):
+    path: str          # Relative to project root (e.g. .forge/memory/MEMORY.md)
+    abs_path: str      # Absolute path on disk
+    namespace: str     # project | session | agent
+    agent: str | None  # Agent name (only for namespace=agent)
+    mtime: float
+    mtime_ns: int
+    inode: int
+    size: int          # Byte length
+    hash: str | None   # SHA-256, only computed when the stat tuple changed
+
+
+class ChangeSet(TypedDict):
+    files: dict[str, FileInfo]  # Every markdown file on disk, by relative path
+    dirty: list[str]            # New files and files whose stat tuple changed
+    deleted: list[str]          # Indexed paths no longer on disk
+    dirs: dict[str, int]        # Directory mtimes to record after a sync
+    dirs_changed: bool          # True if any directory had to be listed
+    complete: bool              # False for a partial scan (see scan_paths)
+
+
+# Hash files in a thread pool once at least this many need hashing
+_PARALLEL_HASH_MIN = 8
+
+# A file or directory modified this recently may change again within the
+# same mtime tick, so its mtime is not trusted on the next scan.
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def compute_hash(filepath: str) -> str:
+    """Compute the SHA-256 hex digest of a file's content."""
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        # Large blocks let hashlib release the GIL while hashing in threads
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_files(files: list[FileInfo]) -> None:
+    """Fill in ``hash`` for *files*, in parallel when there are many."""
+    timing.count("files_hashed", len(files))
+    if len(files) < _PARALLEL_HASH_MIN:
+        for fi in files:
+            fi["hash"] = compute_hash(fi["abs_path"])
+        return
+    workers = min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for fi, digest in zip(files, pool.map(compute_hash, [fi["abs_path"] for fi in files])):
+            fi["hash"] = digest
+
+
+def stat_key(file_info: FileInfo) -> tuple[int, int, int]:
+    return file_info["size"], file_info["mtime_ns"], file_info["inode"]
+
+
+def trusted_mtime_ns(mtime_ns: int) -> int:
+    """Return the mtime_ns to record, or 0 if it is too recent to trust."""
+    if time.time_ns() - mtime_ns < _RACY_WINDOW_NS:
+        return 0
+    return mtime_ns
+
+
+def detect_namespace(rel_path: str) -> tuple[str, str | None]:
+    """Detect namespace and optional agent name from a relative path.
+
+    Rules:
+      - MEMORY.md (at root of memory dir) → 'project'
+      - sessions/*.md → 'session'
+      - agents/<name>.md and agents/<name>/**.md → 'agent', <name>
+      - anything else → 'project'
+    """
+    # Normalise separators
+    parts = rel_path.replace("\\", "/").split("/")
+
+    basename = parts[-1]
+
+    if len(parts) == 1 and basename.upper() == "MEMORY.MD":
+        return "project", None
+
+    if len(parts) >= 2:
+        folder = parts[0].lower()
+        if folder == "sessions":
+            return "session", None
+        if folder == "agents":
+            name = parts[1] if len(parts) > 2 else os.path.splitext(basename)[0]
+            return "agent", name
+
+    return "project", None
+
+
+def _file_info(
+    abs_path: str,
+    st: os.stat_result,
+    source_dir: str,
+    project_root: str,
+    namespace_override: str | None,
+) -> FileInfo:
+    if namespace_override:
+        namespace, agent = namespace_override, None
+    else:
+        namespace, agent = detect_namespace(os.path.relpath(abs_path, source_dir))
+    return FileInfo(
+        path=os.path.relpath(abs_path, project_root),
+        abs_path=abs_path,
+        namespace=namespace,
+        agent=agent,
+        mtime=st.st_mtime,
+        mtime_ns=st.st_mtime_ns,
+        inode=st.st_ino,
+        size=st.st_size,
+        hash=None,
+    )
+
+
+def _scan_roots(project_root: str) -> list[tuple[str, str | None]]:
+    """Return ``(directory, namespace override)`` for every scanned tree."""
+    roots: list[tuple[str, str | None]] = [(get_memory_dir(project_root), None)]
+    roots += [(d, "project") for d in get_extra_scan_dirs(project_root)]
+    return roots
+
+
+def _scan_tree(
+    source_dir: str,
+    project_root: str,
+    namespace_override: str | None,
+    stored_files: dict[str, tuple],
+    stored_dirs: dict[str, int],
+    known_files: dict[str, list[str]],
+    known_dirs: dict[str, list[str]],
+    changes: ChangeSet,
+) -> None:
+    """Walk *source_dir*, adding its markdown files to *changes*."""
+    stack = [source_dir]
+    while stack:
+        abs_dir = stack.pop()
+        rel_dir = os.path.relpath(abs_dir, project_root)
+        try:
+            dir_mtime_ns = os.stat(abs_dir).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        changes["dirs"][rel_dir] = trusted_mtime_ns(dir_mtime_ns)
+
+        if stored_dirs.get(rel_dir) == dir_mtime_ns:
+            # Same entries as last time: reuse the recorded listing
+            subdirs = [os.path.join(project_root, d) for d in known_dirs.get(rel_dir, [])]
+            names = [os.path.basename(p) for p in known_files.get(rel_dir, [])]
+        else:
+            changes["dirs_changed"] = True
+            timing.count("dirs_listed")
+            subdirs, names = [], []
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    # Like os.walk, do not descend into symlinked directories
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif not entry.is_dir() and entry.name.lower().endswith(".md"):
+                        names.append(entry.name)
+        stack.extend(subdirs)
+
+        for name in names:
+            abs_path = os.path.join(abs_dir, name)
+            try:
+                st = os.stat(abs_path)
+            except FileNotFoundError:
+                continue
+            info = _file_info(abs_path, st, source_dir, project_root, namespace_override)
+            changes["files"][info["path"]] = info
+            if stored_files.get(info["path"]) != stat_key(info):
+                changes["dirty"].append(info["path"])
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def scan(db: sqlite3.Connection, project_root: str) -> ChangeSet:
+    """Compare the markdown trees on disk with the index in one pass.
+
+    Scans .forge/memory/ and the extra scan directories (``docs/``).
+    No file is read or hashed; see :func:`hash_files`.
+    """
+    stored_files = {
+        row["path"]: (row["size"], row["mtime_ns"], row["inode"])
+        for row in db.execute("SELECT path, size, mtime_ns, inode FROM files")
+    }
+    stored_dirs = {
+        row["path"]: row["mtime_ns"]
+        for row in db.execute("SELECT path, mtime_ns FROM dirs")
+    }
+
+    known_files: dict[str, list[str]] = {}
+    for path in stored_files:
+        known_files.setdefault(os.path.dirname(path), []).append(path)
+    known_dirs: dict[str, list[str]] = {}
+    for path in stored_dirs:
+        known_dirs.setdefault(os.path.dirname(path), []).append(path)
+
+    changes = ChangeSet(files={}, dirty=[], deleted=[], dirs={},
+                        dirs_changed=False, complete=True)
+    for source_dir, namespace_override in _scan_roots(project_root):
+        if os.path.isdir(source_dir):
+            _scan_tree(source_dir, project_root, namespace_override,
+                       stored_files, stored_dirs, known_files, known_dirs, changes)
+
+    changes["deleted"] = [p for p in stored_files if p not in changes["files"]]
+    if set(stored_dirs) != set(changes["dirs"]):
+        changes["dirs_changed"] = True
+    timing.count("files_scanned", len(changes["files"]))
+    timing.count("files_dirty", len(changes["dirty"]))
+    return changes
+
+
+def scan_paths(db: sqlite3.Connection, project_root: str, paths: list[str]) -> ChangeSet:
+    """Build a partial change set for specific absolute *paths* only.
+
+    Used by ``forge-memory watch`` to feed just the files it saw change
+    into :func:`sync.sync`. Paths outside the scanned trees or that are not
+    markdown files are ignored.
+    """
+    changes = ChangeSet(files={}, dirty=[], deleted=[], dirs={},
+                        dirs_changed=False, complete=False)
+    roots = _scan_roots(project_root)
+    for abs_path in paths:
+        if not abs_path.lower().endswith(".md"):
+            continue
+        source = next(
+            (root for root in roots
+             if os.path.commonpath([root[0], abs_path]) == root[0]),
+            None,
+        )
+        if source is None:
+            continue
+        rel_path = os.path.relpath(abs_path, project_root)
+        stored = db.execute(
+            "SELECT size, mtime_ns, inode FROM files WHERE path = ?", (rel_path,)
+        ).fetchone()
+        try:
+            st = os.stat(abs_path)
+        except FileNotFoundError:
+            if stored is not None:
+                changes["deleted"].append(rel_path)
+            continue
+        info = _file_info(abs_path, st, source[0], project_root, source[1])
+        changes["files"][rel_path] = info
+        if stored is None or tuple(stored) != stat_key(info):
+            changes["dirty"].append(rel_path)
+    return changes
+
+
+def has_changes(changes: ChangeSet) -> bool:
+    """Return True if the index needs a sync to match the disk."""
+    return bool(changes["dirty"] or changes["deleted"])
+
+
+def save_dirs(db: sqlite3.Connection, changes: ChangeSet) -> None:
+    """Record the directory mtimes observed by :func:`scan`.
+
+    Partial change sets carry no directory information and leave the
+    recorded mtimes untouched.
+    """
+    if not changes["complete"]:
+        return
+    db.execute("DELETE FROM dirs")
+    db.executemany(
+        "INSERT INTO dirs (path, mtime_ns) VALUES (?, ?)",
+        list(changes["dirs"].items()),
+    )
@@ -0,0 +1,82 @@
+"""FORGE Vector Memory — Export the embedding model to int8 ONNX.
+
+``forge-memory export-onnx`` converts the configured sentence-transformers
+model into the files the ``onnx`` embedder backend loads:
+
+- ``model_int8.onnx``: the transformer, with dynamically quantized int8
+  weights.
+- ``tokenizer.json``: the matching fast tokenizer.
+- ``forge_onnx.json``: pooling settings (max sequence length, padding id,
+  normalisation).
+
+The export itself needs torch, sentence-transformers and onnxruntime. It
+runs once; afterwards the ``onnx`` backend only needs onnxruntime and
+tokenizers.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+
+from config import EMBEDDING_MODEL, ONNX_MODEL_DIR
+from embedder import ONNX_CONFIG_FILE, ONNX_MODEL_FILE, ONNX_TOKENIZER_FILE
+
+# ONNX opset used for the export (supported by onnxruntime >= 1.10)
+_OPSET = 14
+
+
+def export(output_dir: str = ONNX_MODEL_DIR, *, verbose: bool = False) -> str:
+    """Export and quantize the embedding model into *output_dir*.
+
+    Returns the path of the quantized model file.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+
+    os.makedirs(output_dir, exist_ok=True)
+    sample = tokenizer(["FORGE memory export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids")
+                   if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        float_path = os.path.join(tmp, "model.onnx")
+        if verbose:
+            print(f"Exporting {EMBEDDING_MODEL} to ONNX...")
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(sample[name] for name in input_names),
+                float_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=_OPSET,
+            )
+        if verbose:
+            print("Quantizing weights to int8...")
+        model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+        quantize_dynamic(float_path, model_path, weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, ONNX_TOKENIZER_FILE))
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model": EMBEDDING_MODEL,
+            "max_seq_length": st_model.max_seq_length,
+            "pad_token_id": tokenizer.pad_token_id or 0,
+            "normalize": normalize,
+        }, f, indent=2)
+        f.write("\n")
+
+    if verbose:
+        size = os.path.getsize(model_path) / (1024 * 1024)
+        print(f"Wrote {model_path} ({size:.1f} MB)")
+    return model_path
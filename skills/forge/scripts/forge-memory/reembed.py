@@ -0,0 +1,307 @@
+"""FORGE Vector Memory — Online re-embedding after a model change.
+
+The ``meta`` table records the model id and dimension the index vectors
+were built with. When they no longer match the configured
+``FORGE_EMBEDDING_MODEL`` / ``FORGE_EMBEDDING_DIM`` / backend, the index is
+migrated without taking search offline:
+
+1. A second vector table is created for the new model and filled in
+   batches, in chunk id order. Texts go through the embedding cache, so an
+   interrupted run resumes from ``meta.reembed_cursor``.
+2. Meanwhile searches keep embedding queries with the old model against
+   the old table, and sync keeps indexing into it (deleted chunks are
+   removed from both tables).
+3. Once every chunk has a new vector, ``meta`` is pointed at the new table
+   in a single transaction and the old table and the old model's cached
+   vectors are dropped.
+
+Search and sync start the migration as a detached ``forge-memory reembed``
+process; a lock file next to the database keeps it to one worker per
+project. Each batch holds the index's writer lock (see
+:func:`db.writer_lock`), so batches and syncs take turns instead of
+failing on each other's write transactions.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import embed_cache
+from config import (
+    EMBED_BATCH_SIZE,
+    EMBEDDING_DIM,
+    MODEL_ID,
+    REEMBED_LOCK_FILENAME,
+    REEMBED_LOG_FILENAME,
+    get_db_path,
+)
+from db import (
+    bump_generation,
+    get_meta,
+    init_db,
+    vec_insert_sql,
+    vec_table_sql,
+    writer_lock,
+)
+
+# Chunks embedded per committed batch; small enough that sync and search
+# are never held up for long
+_BATCH_CHUNKS = EMBED_BATCH_SIZE * 4
+
+_CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _target() -> dict[str, str]:
+    return {"reembed_model": MODEL_ID, "reembed_dim": str(EMBEDDING_DIM)}
+
+
+def _lock(project_root: str) -> int | None:
+    """Take the project's re-embedding lock, or return ``None`` if it is held."""
+    path = os.path.join(os.path.dirname(get_db_path(project_root)), REEMBED_LOCK_FILENAME)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _next_table(live: str) -> str:
+    """Return the name of the table to build next to *live*."""
+    base, _, generation = live.rpartition("_")
+    if generation.isdigit():
+        return f"{base}_{int(generation) + 1}"
+    return f"{live}_2"
+
+
+def _set_meta(db: sqlite3.Connection, items: dict[str, str]) -> None:
+    db.executemany(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list(items.items()),
+    )
+
+
+def _prepare(db: sqlite3.Connection) -> str:
+    """Create (or resume) the table being built and return its name."""
+    meta = get_meta(db)
+    table = meta.get("reembed_table")
+    if table and all(meta.get(key) == value for key, value in _target().items()):
+        return table
+
+    # First run, or the configuration changed again mid-way
+    if table:
+        db.execute(f"DROP TABLE IF EXISTS {table}")
+    db.execute("DELETE FROM meta WHERE key LIKE 'reembed_%'")
+    table = _next_table(meta["vec_table"])
+    db.execute(f"DROP TABLE IF EXISTS {table}")
+    db.execute(vec_table_sql(table, EMBEDDING_DIM))
+    _set_meta(db, {"reembed_table": table, "reembed_cursor": "0", **_target()})
+    db.commit()
+    return table
+
+
+def _embed(
+    db: sqlite3.Connection, rows: list[sqlite3.Row],
+) -> tuple[dict[int, bytes], dict[str, bytes]]:
+    """Embed ``chunks`` *rows* with the configured model, without writing.
+
+    Returns the vectors by chunk id, and those that missed the embedding
+    cache by text hash, for :func:`embed_cache.store` under the write lock.
+    """
+    fresh: dict[str, bytes] = {}
+    blobs, _encoded = embed_cache.embed(
+        db, [row["text"] for row in rows], [row["text_hash"] for row in rows], MODEL_ID,
+        fresh=fresh,
+    )
+    return {row["id"]: blob for row, blob in zip(rows, blobs)}, fresh
+
+
+def _insert(db: sqlite3.Connection, table: str, blobs: dict[int, bytes]) -> None:
+    """Insert new-model vectors into *table*; the caller holds the write lock.
+
+    Embedding happens before the lock is taken, so chunks deleted by a
+    concurrent sync in the meantime are skipped, and namespace/agent are
+    re-read in case the file was re-tagged.
+    """
+    current = db.execute(
+        """SELECT c.id, f.namespace, COALESCE(f.agent, '') AS agent, c.file_id
+           FROM chunks c
+           JOIN files f ON f.id = c.file_id
+           WHERE c.id IN (SELECT value FROM json_each(?))""",
+        (json.dumps(list(blobs)),),
+    ).fetchall()
+    db.executemany(
+        vec_insert_sql(table),
+        [(row["id"], blobs[row["id"]], row["namespace"], row["agent"], row["file_id"])
+         for row in current],
+    )
+
+
+def _missing(db: sqlite3.Connection, table: str) -> list[sqlite3.Row]:
+    """Return the chunks that have no vector in *table* yet."""
+    done = {row[0] for row in db.execute(f"SELECT chunk_id FROM {table}")}
+    ids = [row[0] for row in db.execute("SELECT id FROM chunks") if row[0] not in done]
+    return db.execute(
+        "SELECT id, text, text_hash FROM chunks WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),),
+    ).fetchall()
+
+
+def _migrate(db: sqlite3.Connection, db_path: str, verbose: bool) -> None:
+    with writer_lock(db_path):
+        table = _prepare(db)
+    cursor = int(get_meta(db)["reembed_cursor"])
+    while True:
+        rows = db.execute(
+            "SELECT id, text, text_hash FROM chunks WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor, _BATCH_CHUNKS),
+        ).fetchall()
+        if not rows:
+            break
+        # The model runs outside the lock, so syncs never wait behind it
+        blobs, fresh = _embed(db, rows)
+        with writer_lock(db_path):
+            db.execute("BEGIN IMMEDIATE")
+            embed_cache.store(db, fresh, MODEL_ID)
+            _insert(db, table, blobs)
+            cursor = rows[-1]["id"]
+            _set_meta(db, {"reembed_cursor": str(cursor)})
+            db.commit()
+        if verbose:
+            done, total = progress(db) or (0, 0)
+            print(f"  Re-embedded {done}/{total} chunk(s)", flush=True)
+
+    # Chunks re-tagged by a sync since they were copied lost their new
+    # vector. Embed those before taking the write lock for the switch, so
+    # the switch itself only has to store them.
+    _blobs, fresh = _embed(db, _missing(db, table))
+
+    with writer_lock(db_path):
+        db.execute("BEGIN IMMEDIATE")
+        embed_cache.store(db, fresh, MODEL_ID)
+        blobs, fresh = _embed(db, _missing(db, table))
+        embed_cache.store(db, fresh, MODEL_ID)
+        _insert(db, table, blobs)
+        old = get_meta(db)["vec_table"]
+        _set_meta(db, {
+            "embedding_model": MODEL_ID,
+            "embedding_dim": str(EMBEDDING_DIM),
+            "vec_table": table,
+        })
+        db.execute("DELETE FROM meta WHERE key LIKE 'reembed_%'")
+        bump_generation(db)
+        db.execute(f"DROP TABLE IF EXISTS {old}")
+        db.execute("DELETE FROM embedding_cache WHERE model != ?", (MODEL_ID,))
+        db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def needs_reembed(db: sqlite3.Connection) -> bool:
+    """Return True if the index was built with another model or dimension."""
+    meta = get_meta(db)
+    return (meta["embedding_model"], meta["embedding_dim"]) != (MODEL_ID, str(EMBEDDING_DIM))
+
+
+def progress(db: sqlite3.Connection) -> tuple[int, int] | None:
+    """Return ``(chunks done, total chunks)`` of the running re-embedding.
+
+    Returns ``None`` when no re-embedding has started.
+    """
+    meta = get_meta(db)
+    if not meta.get("reembed_table"):
+        return None
+    done, total = db.execute(
+        "SELECT COUNT(CASE WHEN id <= ? THEN 1 END), COUNT(*) FROM chunks",
+        (int(meta["reembed_cursor"]),),
+    ).fetchone()
+    return done, total
+
+
+def start_if_needed(db: sqlite3.Connection, project_root: str) -> bool:
+    """Start a background re-embedding if the index needs one.
+
+    Does nothing if a worker is already running, or if the last attempt for
+    the configured model failed (``forge-memory reembed`` retries it in the
+    foreground). Output of the worker goes to ``reembed.log`` next to the
+    database.
+
+    Returns True if a worker was started.
+    """
+    if not needs_reembed(db):
+        return False
+    if get_meta(db).get("reembed_failed") == MODEL_ID:
+        return False
+    fd = _lock(project_root)
+    if fd is None:
+        return False
+    os.close(fd)
+
+    log_path = os.path.join(os.path.dirname(get_db_path(project_root)), REEMBED_LOG_FILENAME)
+    with open(log_path, "a", encoding="utf-8") as log:
+        subprocess.Popen(
+            [sys.executable, _CLI_PATH, "reembed", "--background"],
+            cwd=project_root,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    return True
+
+
+def run(project_root: str, *, verbose: bool = False) -> bool:
+    """Re-embed the index with the configured model and switch to it.
+
+    Parameters
+    ----------
+    project_root:
+        Absolute path to the project root containing .forge/memory/.
+    verbose:
+        If ``True``, print progress after every batch.
+
+    Returns
+    -------
+    True if the index was migrated, False if it already matched the
+    configured model.
+
+    Raises
+    ------
+    RuntimeError
+        If another re-embedding of the project is running.
+    """
+    fd = _lock(project_root)
+    if fd is None:
+        raise RuntimeError("A re-embedding is already running for this project.")
+    try:
+        db_path = get_db_path(project_root)
+        db = init_db(db_path)
+        try:
+            if not needs_reembed(db):
+                return False
+            db.execute("DELETE FROM meta WHERE key = 'reembed_failed'")
+            db.commit()
+            try:
+                _migrate(db, db_path, verbose)
+            except Exception:
+                db.rollback()
+                # Keep search and sync from restarting a worker that fails
+                # the same way every time
+                _set_meta(db, {"reembed_failed": MODEL_ID})
+                db.commit()
+                raise
+            return True
+        finally:
+            db.close()
+    finally:
+        os.close(fd)
@@ -0,0 +1,172 @@
+"""FORGE Vector Memory — Search result cache.
+
+Agents often repeat a search within a session. Result lists are kept in the
+``search_cache`` table of ``index.sqlite``, keyed by the normalised query
+and every option that shapes the results, and stamped with the index
+generation they were computed on (see :func:`db.generation`). Every sync
+that changes the index bumps the generation, so a stale list is never
+served; old entries are dropped the next time the cache is written.
+
+A hit returns before the query is embedded, so it never loads the model.
+The table keeps the ``FORGE_SEARCH_CACHE_SIZE`` most recently used entries
+and, living in the index, is shared by every process searching it.
+
+Entries also keep the query's vector. A new query with the same options
+whose vector is within ``FORGE_SEARCH_CACHE_SIMILARITY`` cosine similarity
+of a cached one (agents paraphrase: "auth architecture", "architecture of
+auth") reuses that query's results, flagged with ``similar_query``, and
+skips the KNN and full-text searches.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import TypedDict
+
+import timing
+from config import (
+    CHUNK_OVERLAP_MODE,
+    CHUNK_OVERLAP_TOKENS,
+    FTS_WEIGHT,
+    SEARCH_CACHE_SIMILARITY,
+    SEARCH_CACHE_SIZE,
+    VECTOR_WEIGHT,
+)
+from db import generation as current_generation
+from db import write_if_free
+
+
+class Entry(TypedDict):
+    scope: str
+    query: str              # Normalised query text
+    embedding: bytes | None  # Query vector; None for results of a similar query
+    results: list
+
+
+def _digest(payload: list) -> str:
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def normalise(query: str) -> str:
+    """Collapse whitespace: both retrievers split on it, so results match."""
+    return " ".join(query.split())
+
+
+def scope(
+    *,
+    namespace: str | None,
+    agent: str | None,
+    limit: int,
+    threshold: float,
+) -> str:
+    """Return the id of every search option other than the query text."""
+    return _digest([
+        None if namespace == "all" else namespace or None,
+        agent or None,
+        limit,
+        threshold,
+        VECTOR_WEIGHT,
+        FTS_WEIGHT,
+        # Stitching shapes the result texts
+        CHUNK_OVERLAP_MODE,
+        CHUNK_OVERLAP_TOKENS,
+    ])
+
+
+def key(query: str, scope: str) -> str:
+    """Return the cache key of *query* searched with the options of *scope*."""
+    return _digest([normalise(query), scope])
+
+
+def lookup(db: sqlite3.Connection, keys: list[str], generation: int) -> dict[str, list]:
+    """Return the cached results of *keys* computed on *generation*.
+
+    Misses are absent. Call inside the read transaction *generation* was
+    read in.
+    """
+    with timing.stage("cache_lookup"):
+        found = {
+            row["key"]: json.loads(row["results"])
+            for row in db.execute(
+                "SELECT key, results FROM search_cache "
+                "WHERE generation = ? AND key IN (SELECT value FROM json_each(?))",
+                (generation, json.dumps(keys)),
+            )
+        }
+    timing.count("cache_hits", len(found))
+    timing.count("cache_misses", len(keys) - len(found))
+    return found
+
+
+def similar(
+    db: sqlite3.Connection,
+    scope: str,
+    query_blob: bytes,
+    generation: int,
+) -> tuple[str, list] | None:
+    """Return ``(key, results)`` of the cached query nearest to *query_blob*.
+
+    Only queries searched with the same options on *generation* count, and
+    only if their cosine similarity reaches ``SEARCH_CACHE_SIMILARITY``.
+    Each returned result carries the cached query as ``similar_query`` and
+    the similarity as ``query_similarity``. ``None`` if nothing is close.
+    """
+    if SEARCH_CACHE_SIMILARITY <= 0:
+        return None
+    with timing.stage("cache_similar"):
+        row = db.execute(
+            """SELECT key, query, results,
+                      1 - vec_distance_cosine(embedding, ?) AS similarity
+               FROM search_cache
+               WHERE generation = ? AND scope = ? AND embedding IS NOT NULL
+               ORDER BY similarity DESC LIMIT 1""",
+            (query_blob, generation, scope),
+        ).fetchone()
+    if row is None or row["similarity"] < SEARCH_CACHE_SIMILARITY:
+        return None
+    timing.count("cache_similar_hits")
+    flag = {"similar_query": row["query"], "query_similarity": round(row["similarity"], 4)}
+    return row["key"], [{**result, **flag} for result in json.loads(row["results"])]
+
+
+def save(
+    db: sqlite3.Connection,
+    generation: int,
+    fresh: dict[str, Entry],
+    hits: list[str],
+) -> None:
+    """Store *fresh* entries by key and mark *hits* as recently used.
+
+    Entries of older generations are dropped and the table is trimmed to
+    its size limit. Skipped if another process is writing to the index, and
+    if a sync changed the index since the results were computed.
+    """
+    now = time.time()
+
+    def write(db: sqlite3.Connection) -> None:
+        if current_generation(db) != generation:
+            return
+        db.execute("DELETE FROM search_cache WHERE generation < ?", (generation,))
+        db.executemany(
+            "INSERT OR REPLACE INTO search_cache "
+            "(key, generation, results, used, scope, query, embedding) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (k, generation, json.dumps(entry["results"]), now,
+                 entry["scope"], entry["query"], entry["embedding"])
+                for k, entry in fresh.items()
+            ],
+        )
+        db.executemany(
+            "UPDATE search_cache SET used = ? WHERE key = ?", [(now, k) for k in hits],
+        )
+        db.execute(
+            "DELETE FROM search_cache WHERE key IN "
+            "(SELECT key FROM search_cache ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (SEARCH_CACHE_SIZE,),
+        )
+
+    with timing.stage("cache_write"):
+        write_if_free(db, write)
@@ -5,30 +5,44 @@ search (via FTS5) using weighted score fusion.
 """
 from __future__ import annotations
 
-import os
-from typing import Any, TypedDict
-
-import numpy as np
-
+import json
+import sqlite3
+from typing import Any, Iterator, TypedDict
+
+import manifest
+import reembed
+import result_cache
+import telemetry
+import timing
+from chunker import edge_lines, opens_section
 from config import (
+    CHUNK_OVERLAP_MODE,
+    CHUNK_OVERLAP_TOKENS,
     DEFAULT_LIMIT,
     DEFAULT_THRESHOLD,
     FTS_WEIGHT,
+    SEARCH_CACHE_SIZE,
+    VECTOR_QUANTIZATION,
     VECTOR_WEIGHT,
     get_db_path,
-    get_extra_scan_dirs,
-    get_memory_dir,
 )
-from db import get_connection, init_db
-from embedder import encode_single
-from sync import sync
+from db import VEC_PARAM_SQL, generation, index_model, init_db, write_if_free
+from sync import chunking_fingerprint, indexed_chunking, sync
 
 
 # ---------------------------------------------------------------------------
 # Types
 # ---------------------------------------------------------------------------
 
-class SearchResult(TypedDict):
+class BatchQuery(TypedDict, total=False):
+    query: str              # Required
+    namespace: str | None
+    agent: str | None
+    limit: int
+    threshold: float
+
+
+class _ResultFields(TypedDict):
     text: str
     file: str
     namespace: str
@@ -38,47 +52,24 @@ class SearchResult(TypedDict):
     score: float
 
 
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-def _should_auto_sync(project_root: str) -> bool:
-    """Return True if any .md file has been modified, added, or deleted since the last sync."""
-    db_path = get_db_path(project_root)
-    memory_dir = get_memory_dir(project_root)
-
-    if not os.path.exists(db_path):
-        return True
-
-    db = get_connection(db_path)
-    rows = db.execute("SELECT path, mtime FROM files").fetchall()
-    db.close()
-    stored_mtimes = {row["path"]: row["mtime"] for row in rows}
+class SearchResult(_ResultFields, total=False):
+    # Set when the results are those cached for a near-identical query
+    similar_query: str
+    query_similarity: float
 
-    # Collect disk files with their mtimes (relative paths matching sync.py convention)
-    disk_mtimes: dict[str, float] = {}
-    dirs_to_check = [memory_dir] + get_extra_scan_dirs(project_root)
-    for scan_dir in dirs_to_check:
-        if not os.path.isdir(scan_dir):
-            continue
-        for dirpath, _dirs, filenames in os.walk(scan_dir):
-            for fname in filenames:
-                if fname.lower().endswith(".md"):
-                    fpath = os.path.join(dirpath, fname)
-                    rel_path = os.path.relpath(fpath, project_root)
-                    disk_mtimes[rel_path] = os.path.getmtime(fpath)
 
-    # Detect additions or deletions (different file sets)
-    if set(disk_mtimes.keys()) != set(stored_mtimes.keys()):
-        return True
+# Seconds a search waits for a sync running in another process before
+# searching the index as last committed
+_AUTO_SYNC_WAIT = 2.0
 
-    # Detect modifications (mtime changed since last sync)
-    for path, disk_mtime in disk_mtimes.items():
-        if disk_mtime != stored_mtimes[path]:
-            return True
+# Coarse KNN candidates fetched per wanted result, by storage format; the
+# quantized distances are only good enough to shortlist for re-scoring
+_OVERSAMPLE = {"float": 1, "int8": 4, "bit": 16}
 
-    return False
 
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
 
 def _normalise_fts_query(query: str) -> str:
     """Prepare a query string for FTS5 MATCH.
@@ -94,74 +85,153 @@ def _normalise_fts_query(query: str) -> str:
     return " OR ".join(quoted)
 
 
-# ---------------------------------------------------------------------------
-# Public API
-# ---------------------------------------------------------------------------
+def _vector_search(
+    db: sqlite3.Connection,
+    table: str,
+    model: str,
+    query_blob: bytes,
+    k: int,
+    filters: str = "",
+    params: tuple | list = (),
+) -> list[tuple[int, float]]:
+    """Return ``(chunk_id, distance)`` for the *k* nearest chunks, nearest first.
+
+    With quantized storage the KNN table is over-fetched and the shortlist
+    is re-scored by exact L2 distance against the float vectors in the
+    embedding cache, so distances are comparable across formats. *table*
+    and *model* are the index's vector table and the model that built it
+    (see :func:`db.index_model`).
+    """
+    with timing.stage("vec_knn"):
+        rows = db.execute(
+            f"SELECT chunk_id, distance FROM {table} "
+            f"WHERE embedding MATCH {VEC_PARAM_SQL} AND k = ?{filters} ORDER BY distance",
+            (query_blob, k * _OVERSAMPLE[VECTOR_QUANTIZATION], *params),
+        ).fetchall()
+    timing.count("vec_candidates", len(rows))
+    if VECTOR_QUANTIZATION == "float":
+        return [(row["chunk_id"], row["distance"]) for row in rows]
 
-def search(
-    project_root: str,
+    with timing.stage("vec_rescore"):
+        rescored = db.execute(
+            """SELECT c.id, vec_distance_l2(e.embedding, ?) AS distance
+               FROM chunks c
+               JOIN embedding_cache e ON e.model = ? AND e.text_hash = c.text_hash
+               WHERE c.id IN (SELECT value FROM json_each(?))""",
+            (query_blob, model, json.dumps([row["chunk_id"] for row in rows])),
+        ).fetchall()
+    return sorted(((row["id"], row["distance"]) for row in rescored),
+                  key=lambda item: item[1])[:k]
+
+
+def _auto_sync(db: sqlite3.Connection, project_root: str) -> None:
+    """Sync the index first if the markdown trees changed since the last sync.
+
+    Also syncs (and so re-chunks every file) if the chunking settings
+    changed, so that stitching never runs on chunks that overlap. If
+    another process is already syncing, the search does not wait for it
+    beyond ``_AUTO_SYNC_WAIT`` seconds.
+    """
+    # Hand the scan result over so sync does not walk the trees a second time
+    with timing.stage("scan"):
+        changes = manifest.scan(db, project_root)
+    if manifest.has_changes(changes) or indexed_chunking(db) != chunking_fingerprint():
+        try:
+            with timing.stage("sync"):
+                sync(project_root, db=db, changes=changes, wait=_AUTO_SYNC_WAIT)
+        except TimeoutError:
+            # Another process is indexing: search its last committed state
+            timing.count("sync_busy")
+    elif changes["dirs_changed"]:
+        write_if_free(db, lambda db: manifest.save_dirs(db, changes))
+    reembed.start_if_needed(db, project_root)
+
+
+def _stitch(
+    db: sqlite3.Connection, chunk_ids: list[int],
+) -> dict[int, tuple[list[str], int, list[str], int]]:
+    """Return the context to add around each hit of an overlap-free index.
+
+    Up to ``CHUNK_OVERLAP_TOKENS`` of whole lines are taken from the end of
+    the previous chunk and from the start of the next one, within the same
+    file and section, i.e. the context overlap would have stored twice.
+
+    Returns ``{chunk id: (lines before, their first line, lines after,
+    their last line)}``; hits without neighbours are absent.
+    """
+    context: dict[int, tuple[list[str], int, list[str], int]] = {}
+    for row in db.execute(
+        """SELECT h.id AS hit, h.start_line AS hit_start, h.end_line AS hit_end,
+                  h.text AS hit_text, n.chunk_index - h.chunk_index AS side,
+                  n.text, n.start_line, n.end_line
+           FROM chunks h
+           JOIN chunks n ON n.file_id = h.file_id
+                        AND n.chunk_index IN (h.chunk_index - 1, h.chunk_index + 1)
+           WHERE h.id IN (SELECT value FROM json_each(?))""",
+        (json.dumps(chunk_ids),),
+    ):
+        # Adjacent sections can share a heading: compare sections, not headings
+        if opens_section(row["hit_text"] if row["side"] < 0 else row["text"]):
+            continue
+        before, first, after, last = context.get(
+            row["hit"], ([], row["hit_start"], [], row["hit_end"])
+        )
+        if row["side"] < 0:
+            before = edge_lines(row["text"], CHUNK_OVERLAP_TOKENS, tail=True)
+            first = row["end_line"] - len(before) + 1
+        else:
+            after = edge_lines(row["text"], CHUNK_OVERLAP_TOKENS, tail=False)
+            last = row["start_line"] + len(after) - 1
+        context[row["hit"]] = (before, first, after, last)
+    return context
+
+
+def _hybrid_search(
+    db: sqlite3.Connection,
+    table: str,
+    model: str,
     query: str,
+    query_blob: bytes,
     *,
-    namespace: str | None = None,
-    agent: str | None = None,
-    limit: int = DEFAULT_LIMIT,
-    threshold: float = DEFAULT_THRESHOLD,
+    namespace: str | None,
+    agent: str | None,
+    limit: int,
+    threshold: float,
 ) -> list[SearchResult]:
-    """Run a hybrid vector + FTS5 search over the memory index.
-
-    Parameters
-    ----------
-    project_root:
-        Absolute path to the project root.
-    query:
-        Natural-language search query.
-    namespace:
-        Filter results to a specific namespace (``project``, ``session``,
-        ``agent``). ``None`` or ``"all"`` returns all namespaces.
-    agent:
-        Filter results to a specific agent name (only meaningful when
-        namespace is ``agent`` or ``None``).
-    limit:
-        Maximum number of results to return.
-    threshold:
-        Minimum fused score to include in results (0..1).
+    """Fuse vector and FTS5 results for one query embedded as *query_blob*.
 
-    Returns
-    -------
-    List of :class:`SearchResult` dicts sorted by descending score.
+    The caller holds a read transaction in which *table* and *model* were
+    read (see :func:`db.index_model`).
     """
-    if not query.strip():
-        return []
-
-    # Auto-sync if needed
-    if _should_auto_sync(project_root):
-        sync(project_root)
-
-    db_path = get_db_path(project_root)
-    if not os.path.exists(db_path):
-        return []
-
-    db = get_connection(db_path)
-
     # Expanded fetch window
     fetch_limit = limit * 3
 
+    # Filters are pushed into both retrievers so every candidate matches
+    if namespace == "all":
+        namespace = None
+    vec_filters, fts_filters = "", ""
+    filter_params: list[Any] = []
+    if namespace:
+        vec_filters += " AND namespace = ?"
+        fts_filters += " AND f.namespace = ?"
+        filter_params.append(namespace)
+    if agent:
+        vec_filters += " AND agent = ?"
+        fts_filters += " AND f.agent = ?"
+        filter_params.append(agent)
+
     # -----------------------------------------------------------------------
     # 1. Vector search
     # -----------------------------------------------------------------------
-    query_blob = encode_single(query)
-    vec_rows = db.execute(
-        "SELECT chunk_id, distance FROM chunks_vec "
-        "WHERE embedding MATCH ? ORDER BY distance LIMIT ?",
-        (query_blob, fetch_limit),
-    ).fetchall()
+    vec_rows = _vector_search(db, table, model, query_blob, fetch_limit,
+                              vec_filters, filter_params)
 
     vec_scores: dict[int, float] = {}
     if vec_rows:
-        max_dist = max(row["distance"] for row in vec_rows) or 1.0
-        for row in vec_rows:
+        max_dist = max(distance for _cid, distance in vec_rows) or 1.0
+        for chunk_id, distance in vec_rows:
             # Normalise: 0 distance → score 1.0, max distance → score 0.0
-            vec_scores[row["chunk_id"]] = 1.0 - (row["distance"] / max_dist) if max_dist > 0 else 1.0
+            vec_scores[chunk_id] = 1.0 - (distance / max_dist) if max_dist > 0 else 1.0
 
     # -----------------------------------------------------------------------
     # 2. FTS5 search
@@ -169,19 +239,33 @@ def search(
     fts_query = _normalise_fts_query(query)
     fts_scores: dict[int, float] = {}
     try:
-        fts_rows = db.execute(
-            "SELECT rowid, rank FROM chunks_fts WHERE chunks_fts MATCH ? "
-            "ORDER BY rank LIMIT ?",
-            (fts_query, fetch_limit),
-        ).fetchall()
+        with timing.stage("fts_match"):
+            if filter_params:
+                fts_rows = db.execute(
+                    "SELECT chunks_fts.rowid AS rowid, chunks_fts.rank AS rank FROM chunks_fts "
+                    "JOIN chunks c ON c.id = chunks_fts.rowid "
+                    "JOIN files f ON f.id = c.file_id "
+                    f"WHERE chunks_fts MATCH ?{fts_filters} ORDER BY rank LIMIT ?",
+                    (fts_query, *filter_params, fetch_limit),
+                ).fetchall()
+            else:
+                fts_rows = db.execute(
+                    "SELECT rowid, rank FROM chunks_fts WHERE chunks_fts MATCH ? "
+                    "ORDER BY rank LIMIT ?",
+                    (fts_query, fetch_limit),
+                ).fetchall()
+        timing.count("fts_candidates", len(fts_rows))
         if fts_rows:
             # rank is negative (more negative = better). Normalise to [0, 1].
             min_rank = min(row["rank"] for row in fts_rows)  # most negative
             max_rank = max(row["rank"] for row in fts_rows)  # least negative
-            range_rank = max_rank - min_rank if max_rank != min_rank else 1.0
+            range_rank = max_rank - min_rank
             for row in fts_rows:
-                # Best match (most negative rank) → 1.0
-                fts_scores[row["rowid"]] = (max_rank - row["rank"]) / range_rank
+                # Best match (most negative rank) → 1.0; with a filter the
+                # candidates may all tie (or be a single row), and all are best
+                fts_scores[row["rowid"]] = (
+                    (max_rank - row["rank"]) / range_rank if range_rank else 1.0
+                )
     except Exception:
         # FTS query may fail on unusual input — degrade gracefully
         pass
@@ -189,54 +273,354 @@ def search(
     # -----------------------------------------------------------------------
     # 3. Fuse scores
     # -----------------------------------------------------------------------
-    all_chunk_ids = set(vec_scores.keys()) | set(fts_scores.keys())
-    fused: list[tuple[int, float]] = []
-    for cid in all_chunk_ids:
-        vs = vec_scores.get(cid, 0.0)
-        fs = fts_scores.get(cid, 0.0)
-        score = VECTOR_WEIGHT * vs + FTS_WEIGHT * fs
-        if score >= threshold:
-            fused.append((cid, score))
+    with timing.stage("fusion"):
+        all_chunk_ids = set(vec_scores.keys()) | set(fts_scores.keys())
+        fused: list[tuple[int, float]] = []
+        for cid in all_chunk_ids:
+            vs = vec_scores.get(cid, 0.0)
+            fs = fts_scores.get(cid, 0.0)
+            score = VECTOR_WEIGHT * vs + FTS_WEIGHT * fs
+            if score >= threshold:
+                fused.append((cid, score))
+
+        fused.sort(key=lambda x: x[1], reverse=True)
+    timing.count("fused_candidates", len(fused))
 
-    fused.sort(key=lambda x: x[1], reverse=True)
+    # -----------------------------------------------------------------------
+    # 4. Fetch metadata for all candidates at once
+    # -----------------------------------------------------------------------
+    with timing.stage("metadata_fetch"):
+        meta = {
+            row["id"]: row
+            for row in db.execute(
+                """SELECT c.id, c.start_line, c.end_line, c.heading,
+                          f.path, f.namespace
+                   FROM chunks c
+                   JOIN files f ON c.file_id = f.id
+                   WHERE c.id IN (SELECT value FROM json_each(?))""",
+                (json.dumps([cid for cid, _score in fused]),),
+            )
+        }
+    top = [(cid, score) for cid, score in fused if cid in meta][:limit]
 
     # -----------------------------------------------------------------------
-    # 4. Fetch chunk metadata and apply filters
+    # 5. Fetch text for the final results only
     # -----------------------------------------------------------------------
+    with timing.stage("text_fetch"):
+        texts = dict(db.execute(
+            "SELECT id, text FROM chunks WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([cid for cid, _score in top]),),
+        ).fetchall())
+
+    context = {}
+    if CHUNK_OVERLAP_MODE == "stitch" and CHUNK_OVERLAP_TOKENS > 0:
+        with timing.stage("stitch"):
+            context = _stitch(db, [cid for cid, _score in top])
+
+    timing.count("results", len(top))
     results: list[SearchResult] = []
-    for chunk_id, score in fused:
-        if len(results) >= limit:
-            break
-
-        row = db.execute(
-            """SELECT c.text, c.start_line, c.end_line, c.heading,
-                      f.path, f.namespace, f.agent
-               FROM chunks c
-               JOIN files f ON c.file_id = f.id
-               WHERE c.id = ?""",
-            (chunk_id,),
-        ).fetchone()
-
-        if row is None:
-            continue
-
-        # Namespace filter
-        if namespace and namespace != "all" and row["namespace"] != namespace:
-            continue
-
-        # Agent filter
-        if agent and row["agent"] != agent:
-            continue
-
+    for chunk_id, score in top:
+        row = meta[chunk_id]
+        text, start_line, end_line = texts[chunk_id], row["start_line"], row["end_line"]
+        if chunk_id in context:
+            before, start_line, after, end_line = context[chunk_id]
+            text = "\n".join([*before, text, *after])
         results.append(SearchResult(
-            text=row["text"],
+            text=text,
             file=row["path"],
             namespace=row["namespace"],
             heading=row["heading"],
-            start_line=row["start_line"],
-            end_line=row["end_line"],
+            start_line=start_line,
+            end_line=end_line,
             score=round(score, 4),
         ))
+    return results
+
+
+def _cached_or_search(
+    db: sqlite3.Connection,
+    table: str,
+    model: str,
+    query: str,
+    query_blob: bytes,
+    scope: str | None,
+    key: str | None,
+    generation: int,
+    hits: list[str],
+    fresh: dict[str, result_cache.Entry],
+    **options: Any,
+) -> list[SearchResult]:
+    """Search for a query missing from the result cache.
 
-    db.close()
+    Reuses the cached results of a near-identical query if there is one.
+    Without a *key* (cache off) this is :func:`_hybrid_search`. Cache
+    entries used go to *hits*, and entries to store to *fresh*.
+    """
+    if key is None or scope is None:
+        return _hybrid_search(db, table, model, query, query_blob, **options)
+    near = result_cache.similar(db, scope, query_blob, generation)
+    if near:
+        near_key, results = near
+        hits.append(near_key)
+        # Stored without its vector: borrowed results must not be
+        # borrowed again by queries further away from the original
+        embedding = None
+    else:
+        results = _hybrid_search(db, table, model, query, query_blob, **options)
+        embedding = query_blob
+    fresh[key] = result_cache.Entry(
+        scope=scope, query=result_cache.normalise(query), embedding=embedding,
+        results=results,
+    )
     return results
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def search(
+    project_root: str,
+    query: str,
+    *,
+    namespace: str | None = None,
+    agent: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+    threshold: float = DEFAULT_THRESHOLD,
+    db: sqlite3.Connection | None = None,
+    cache: bool = True,
+) -> list[SearchResult]:
+    """Run a hybrid vector + FTS5 search over the memory index.
+
+    Parameters
+    ----------
+    project_root:
+        Absolute path to the project root.
+    query:
+        Natural-language search query.
+    namespace:
+        Filter results to a specific namespace (``project``, ``session``,
+        ``agent``). ``None`` or ``"all"`` returns all namespaces.
+    agent:
+        Filter results to a specific agent name (only meaningful when
+        namespace is ``agent`` or ``None``).
+    limit:
+        Maximum number of results to return.
+    threshold:
+        Minimum fused score to include in results (0..1).
+    db:
+        Open connection to reuse (e.g. from the daemon). When omitted, a
+        connection is opened and closed by this call.
+    cache:
+        Serve and store the results through the search result cache (see
+        :mod:`result_cache`).
+
+    Returns
+    -------
+    List of :class:`SearchResult` dicts sorted by descending score.
+    """
+    if not query.strip():
+        return []
+
+    db_path = get_db_path(project_root)
+    own_db = db is None
+    if own_db:
+        with timing.stage("open_db"):
+            db = init_db(db_path)
+
+    with telemetry.recorded(db, "search"):
+        with timing.stage("auto_sync"):
+            _auto_sync(db, project_root)
+
+        scope = key = None
+        if cache and SEARCH_CACHE_SIZE > 0:
+            scope = result_cache.scope(namespace=namespace, agent=agent,
+                                       limit=limit, threshold=threshold)
+            key = result_cache.key(query, scope)
+        hits: list[str] = []
+        fresh: dict[str, result_cache.Entry] = {}
+
+        # Read the index model and search its table in one read transaction,
+        # so a re-embedding switching tables meanwhile cannot break the search
+        db.execute("BEGIN")
+        try:
+            index_generation = generation(db)
+            cached = result_cache.lookup(db, [key], index_generation) if key else {}
+            if key in cached:
+                results = cached[key]
+                hits.append(key)
+            else:
+                from embedder import encode_single
+
+                model, table = index_model(db)
+                with timing.stage("query_embed"):
+                    query_blob = encode_single(query, model)
+                results = _cached_or_search(
+                    db, table, model, query, query_blob, scope, key, index_generation,
+                    hits, fresh,
+                    namespace=namespace, agent=agent, limit=limit, threshold=threshold,
+                )
+        finally:
+            db.commit()
+        if key:
+            result_cache.save(db, index_generation, fresh, hits)
+
+    if own_db:
+        db.close()
+    return results
+
+
+def search_batch(
+    project_root: str,
+    queries: list[BatchQuery],
+    *,
+    db: sqlite3.Connection | None = None,
+    cache: bool = True,
+) -> Iterator[list[SearchResult]]:
+    """Run many searches over one connection, yielding results per query.
+
+    The freshness check and auto-sync run once for the whole batch, and all
+    query texts missing from the result cache are embedded in a single model
+    call; the KNN and FTS5 lookups then run query by query, and each result
+    list is yielded as soon as it is ready.
+
+    Parameters
+    ----------
+    project_root:
+        Absolute path to the project root.
+    queries:
+        One :class:`BatchQuery` per search. Options a query leaves out take
+        the defaults of :func:`search`.
+    db:
+        Open connection to reuse (e.g. from the daemon). When omitted, a
+        connection is opened and closed by this call.
+    cache:
+        Serve and store the results through the search result cache.
+
+    Yields
+    ------
+    The :func:`search` results of each query, in input order.
+    """
+    db_path = get_db_path(project_root)
+    own_db = db is None
+    if own_db:
+        with timing.stage("open_db"):
+            db = init_db(db_path)
+
+    # The last result set is held back until the batch is wrapped up (read
+    # transaction, result cache, telemetry): callers such as zip() stop
+    # iterating once they have every result and never resume the generator
+    held: list[list[SearchResult]] = []
+    try:
+        with telemetry.recorded(db, "search_batch"):
+            with timing.stage("auto_sync"):
+                _auto_sync(db, project_root)
+
+            options = [
+                {
+                    "namespace": q.get("namespace"),
+                    "agent": q.get("agent"),
+                    "limit": q.get("limit", DEFAULT_LIMIT),
+                    "threshold": q.get("threshold", DEFAULT_THRESHOLD),
+                }
+                for q in queries
+            ]
+            scopes: list[str | None] = [None] * len(queries)
+            keys: list[str | None] = [None] * len(queries)
+            if cache and SEARCH_CACHE_SIZE > 0:
+                scopes = [result_cache.scope(**opts) for opts in options]
+                keys = [
+                    result_cache.key(q["query"], sc) if q["query"].strip() else None
+                    for q, sc in zip(queries, scopes)
+                ]
+            fresh: dict[str, result_cache.Entry] = {}
+
+            db.execute("BEGIN")
+            try:
+                index_generation = generation(db)
+                cached = result_cache.lookup(
+                    db, [k for k in keys if k], index_generation,
+                ) if any(keys) else {}
+                model, table = index_model(db)
+                texts = [
+                    q["query"] for q, k in zip(queries, keys)
+                    if q["query"].strip() and k not in cached
+                ]
+                timing.count("queries", len(queries))
+                blobs = iter([])
+                if texts:
+                    from embedder import encode_batch
+
+                    with timing.stage("query_embed"):
+                        blobs = iter(encode_batch(texts, model=model))
+                hits = [k for k in keys if k in cached]
+                for q, opts, sc, k in zip(queries, options, scopes, keys):
+                    if not q["query"].strip():
+                        results = []
+                    elif k in cached:
+                        results = cached[k]
+                    else:
+                        results = _cached_or_search(
+                            db, table, model, q["query"], next(blobs), sc, k,
+                            index_generation, hits, fresh, **opts,
+                        )
+                    if held:
+                        yield held.pop()
+                    held.append(results)
+            finally:
+                db.commit()
+            if any(keys):
+                result_cache.save(db, index_generation, fresh, hits)
+    finally:
+        if own_db:
+            db.close()
+    yield from held
+
+
+def measure_recall(db: sqlite3.Connection, *, k: int = 10, samples: int = 50) -> float | None:
+    """Estimate recall@k of the vector search against an exact float scan.
+
+    Uses the full-precision vectors of randomly sampled indexed chunks as
+    queries. Each query's own text is left out of both the exact and the
+    approximate neighbours: found at distance 0, it would inflate recall.
+    Returns ``None`` if the index has too few distinct texts.
+    """
+    model, table = index_model(db)
+    queries = db.execute(
+        """SELECT c.text_hash, e.embedding
+           FROM chunks c
+           JOIN embedding_cache e ON e.model = ? AND e.text_hash = c.text_hash
+           ORDER BY random() LIMIT ?""",
+        (model, samples),
+    ).fetchall()
+
+    hits = total = 0
+    for source_hash, query_blob in queries:
+        exact = [
+            row[0] for row in db.execute(
+                """SELECT vec_distance_l2(e.embedding, ?) AS distance
+                   FROM chunks c
+                   JOIN embedding_cache e ON e.model = ? AND e.text_hash = c.text_hash
+                   WHERE c.text_hash != ?
+                   ORDER BY distance LIMIT ?""",
+                (query_blob, model, source_hash, k),
+            )
+        ]
+        if not exact:
+            continue
+        source = {
+            row[0] for row in db.execute(
+                "SELECT id FROM chunks WHERE text_hash = ?", (source_hash,),
+            )
+        }
+        found = [
+            (cid, distance)
+            for cid, distance in _vector_search(db, table, model, query_blob, k + len(source))
+            if cid not in source
+        ][:k]
+        # Compare by distance rather than id so ties between chunks with
+        # identical vectors (repeated text) are not counted as misses
+        cutoff = exact[-1] + 1e-6
+        hits += sum(1 for _cid, distance in found if distance <= cutoff)
+        total += len(exact)
+    return hits / total if total else None
@@ -1,18 +1,53 @@
 """FORGE Vector Memory — Markdown to SQLite synchronisation.
 
-Scans .forge/memory/ for markdown files, detects changes via SHA-256 hashes,
-and re-indexes only modified or new files.
+Takes the change set computed by :mod:`manifest` (a cheap stat comparison of
+size, mtime_ns and inode), confirms changes with SHA-256 hashes, and
+re-indexes only modified or new files. Files that were only appended to
+since the last sync (session logs, MEMORY.md) have just their tail
+re-chunked.
+
+One process syncs at a time (see :func:`db.writer_lock`). A sync that had
+to wait for another rescans afterwards, so it only indexes what the other
+left, and each change is embedded once however many agents sync.
 """
 from __future__ import annotations
 
+import contextlib
 import hashlib
+import itertools
 import os
+import sqlite3
+import time
 from typing import TypedDict
 
-from chunker import chunk_markdown
-from config import get_db_path, get_extra_scan_dirs, get_memory_dir
-from db import get_connection, init_db
-from embedder import encode_batch
+import embed_cache
+import manifest
+import reembed
+import telemetry
+import timing
+from chunker import Chunk, iter_chunks, section_start, text_hash
+from config import (
+    CHUNK_OVERLAP_MODE,
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_SIZE_TOKENS,
+    CHUNK_TOKENIZER,
+    EMBED_BATCH_SIZE,
+    MODEL_ID,
+    SYNC_WAIT_TIMEOUT,
+    get_db_path,
+    get_memory_dir,
+)
+from db import (
+    bulk_load,
+    bump_generation,
+    get_meta,
+    index_model,
+    init_db,
+    vec_insert_sql,
+    vec_tables,
+    writer_lock,
+)
+from manifest import ChangeSet, FileInfo
 
 
 # ---------------------------------------------------------------------------
@@ -24,156 +59,373 @@ class SyncStats(TypedDict):
     updated: int
     deleted: int
     unchanged: int
+    embedded: int      # Chunks sent through the model (embedding cache misses)
 
 
-class FileInfo(TypedDict):
-    path: str          # Relative to project root (e.g. .forge/memory/MEMORY.md)
-    abs_path: str      # Absolute path on disk
-    namespace: str     # project | session | agent
-    agent: str | None  # Agent name (only for namespace=agent)
-    mtime: float
-    hash: str
+class Truncation(TypedDict):
+    """Chunks longer than the model's input, reported by ``sync --verbose``."""
+    budget: int             # Tokens the model reads (see TokenCounter.budget)
+    estimated: int          # Chunks under 4-characters-per-token sizing
+    estimated_over: int     # ... of which longer than the budget
+    sized: int              # Chunks under tokenizer sizing (model mode)
+    sized_over: int         # ... of which longer than the budget
+
+
+# Overlap stored in the index; with stitching, search restores the context
+# from neighbouring chunks instead (see search._stitch)
+_INDEX_OVERLAP = 0 if CHUNK_OVERLAP_MODE == "stitch" else CHUNK_OVERLAP_TOKENS
+
+# Queued chunks that trigger an embedding flush (a few batches' worth, so
+# length sorting has enough texts to group)
+_FLUSH_CHUNKS = EMBED_BATCH_SIZE * 16
 
 
 # ---------------------------------------------------------------------------
-# Helpers
+# Chunking
 # ---------------------------------------------------------------------------
 
-def compute_hash(filepath: str) -> str:
-    """Compute the SHA-256 hex digest of a file's content."""
-    h = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for block in iter(lambda: f.read(8192), b""):
-            h.update(block)
-    return h.hexdigest()
+def chunking_fingerprint(tokenizer: str = CHUNK_TOKENIZER) -> str:
+    """Identify the chunking settings, as stored in ``meta.chunking``.
 
+    A sync with settings other than those the index was chunked with
+    re-chunks every file.
+    """
+    if tokenizer == "model":
+        return f"model:{MODEL_ID}:{CHUNK_SIZE_TOKENS}:{_INDEX_OVERLAP}"
+    return f"estimate:{CHUNK_SIZE_TOKENS}:{_INDEX_OVERLAP}"
 
-def _detect_namespace(rel_path: str) -> tuple[str, str | None]:
-    """Detect namespace and optional agent name from a relative path.
 
-    Rules:
-      - MEMORY.md (at root of memory dir) → 'project'
-      - sessions/*.md → 'session'
-      - anything else → 'project'
-    """
-    # Normalise separators
-    parts = rel_path.replace("\\", "/").split("/")
+def indexed_chunking(db: sqlite3.Connection) -> str:
+    """Return the :func:`chunking_fingerprint` the index was chunked with."""
+    # Indexes from before the settings were recorded used estimated sizes
+    return get_meta(db).get("chunking") or chunking_fingerprint("estimate")
 
-    basename = parts[-1]
 
-    if len(parts) == 1 and basename.upper() == "MEMORY.MD":
-        return "project", None
+def _can_count_tokens(model: str) -> bool:
+    """Whether ``sync --verbose`` can report truncation by *model*.
 
-    if len(parts) >= 2:
-        folder = parts[0].lower()
-        if folder == "sessions":
-            return "session", None
+    With estimated sizing only the report needs a tokenizer, so it is
+    skipped rather than load the model when its tokenizer files are not on
+    disk.
+    """
+    if CHUNK_TOKENIZER == "model":
+        return True
+    from embedder import get_tokenizer
 
-    return "project", None
+    return get_tokenizer(model, load_model=False) is not None
 
 
-def scan_files(
-    source_dir: str,
-    project_root: str,
-    *,
-    namespace_override: str | None = None,
-) -> list[FileInfo]:
-    """Recursively scan *source_dir* for .md files and return metadata.
+def _chunk_lines(
+    lines: list[str], first_line: int, truncation: Truncation | None, model: str,
+) -> list[Chunk]:
+    """Chunk ``lines[first_line:]`` with the configured sizing.
 
-    Parameters
-    ----------
-    source_dir:
-        Directory to scan.
-    project_root:
-        Project root (used for relative paths).
-    namespace_override:
-        If set, force this namespace for all discovered files instead of
-        auto-detecting from path structure.
+    With *truncation*, also count the chunks the model would truncate,
+    under both sizings. With estimated sizing, the chunks are counted with
+    the tokenizer of *model*, the index's (see :func:`_can_count_tokens`).
     """
-    results: list[FileInfo] = []
-    for dirpath, _dirs, filenames in os.walk(source_dir):
-        for fname in filenames:
-            if not fname.lower().endswith(".md"):
-                continue
-            abs_path = os.path.join(dirpath, fname)
-            rel_to_source = os.path.relpath(abs_path, source_dir)
-            rel_to_root = os.path.relpath(abs_path, project_root)
-
-            if namespace_override:
-                namespace, agent = namespace_override, None
-            else:
-                namespace, agent = _detect_namespace(rel_to_source)
-
-            results.append(FileInfo(
-                path=rel_to_root,
-                abs_path=abs_path,
-                namespace=namespace,
-                agent=agent,
-                mtime=os.path.getmtime(abs_path),
-                hash=compute_hash(abs_path),
-            ))
-    return results
+    tail = itertools.islice(lines, first_line, None)
+    if CHUNK_TOKENIZER != "model":
+        chunks = list(iter_chunks(tail, overlap=_INDEX_OVERLAP, first_line=first_line))
+        if truncation is None:
+            return chunks
+        # Imported here so syncs that do not need the tokenizer never load it
+        from embedder import get_tokenizer
+
+        counter = get_tokenizer(model, load_model=False)
+        estimated = chunks
+    else:
+        from embedder import get_tokenizer
+
+        counter = get_tokenizer(MODEL_ID)
+        tail = lines[first_line:]
+        # FORGE_CHUNK_SIZE counts real tokens here, up to what the model
+        # reads; the overlap keeps its share of the chunk
+        size = CHUNK_SIZE_TOKENS if counter.budget is None else min(CHUNK_SIZE_TOKENS, counter.budget)
+        chunks = list(iter_chunks(
+            tail,
+            chunk_size=size,
+            overlap=_INDEX_OVERLAP * size // CHUNK_SIZE_TOKENS,
+            first_line=first_line,
+            sizes=counter.count(tail),
+        ))
+        estimated = (list(iter_chunks(tail, overlap=_INDEX_OVERLAP, first_line=first_line))
+                     if truncation else [])
+
+    if truncation is not None and counter is not None and counter.budget is not None:
+        budget = truncation["budget"] = counter.budget
+        truncation["estimated"] += len(estimated)
+        truncation["estimated_over"] += sum(
+            n > budget for n in counter.count([c["text"] for c in estimated])
+        )
+        if CHUNK_TOKENIZER == "model":
+            truncation["sized"] += len(chunks)
+            truncation["sized_over"] += sum(c["token_count"] > budget for c in chunks)
+    return chunks
 
 
 # ---------------------------------------------------------------------------
 # Core sync logic
 # ---------------------------------------------------------------------------
 
-def _index_file(db, file_info: FileInfo) -> int:
-    """Chunk, embed and insert a single file. Return chunk count."""
-    with open(file_info["abs_path"], "r", encoding="utf-8") as f:
-        content = f.read()
-
-    chunks = chunk_markdown(content)
-    if not chunks:
-        return 0
-
-    # Embed all chunks in a single batch
-    texts = [c["text"] for c in chunks]
-    blobs = encode_batch(texts)
-
-    # Insert file record
-    cur = db.execute(
-        """INSERT INTO files (path, namespace, agent, mtime, hash, chunk_count)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (
-            file_info["path"],
-            file_info["namespace"],
-            file_info["agent"],
-            file_info["mtime"],
-            file_info["hash"],
-            len(chunks),
-        ),
+def _upsert_file(db, file_info: FileInfo, chunk_count: int) -> int:
+    """Insert or update the ``files`` row for *file_info*. Return its id.
+
+    Updating in place keeps the file id (and therefore its chunk rows)
+    stable across re-indexing.
+    """
+    row = db.execute(
+        "SELECT id FROM files WHERE path = ?", (file_info["path"],)
+    ).fetchone()
+    values = (
+        file_info["namespace"],
+        file_info["agent"],
+        file_info["mtime"],
+        manifest.trusted_mtime_ns(file_info["mtime_ns"]),
+        file_info["inode"],
+        file_info["hash"],
+        file_info["size"],
+        chunk_count,
     )
-    file_id = cur.lastrowid
-
-    # Insert chunks + vector rows
-    for idx, (chunk, blob) in enumerate(zip(chunks, blobs)):
-        cur2 = db.execute(
-            """INSERT INTO chunks
-               (file_id, chunk_index, text, start_line, end_line, heading, token_count, embedding)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                file_id,
-                idx,
-                chunk["text"],
-                chunk["start_line"],
-                chunk["end_line"],
-                chunk["heading"],
-                chunk["token_count"],
-                blob,
-            ),
-        )
-        chunk_id = cur2.lastrowid
-        db.execute(
-            "INSERT INTO chunks_vec (chunk_id, embedding) VALUES (?, ?)",
-            (chunk_id, blob),
+    if row is None:
+        cur = db.execute(
+            """INSERT INTO files
+               (namespace, agent, mtime, mtime_ns, inode, hash, size, chunk_count, path)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (*values, file_info["path"]),
         )
+        return cur.lastrowid
+    db.execute(
+        """UPDATE files
+           SET namespace = ?, agent = ?, mtime = ?, mtime_ns = ?, inode = ?, hash = ?,
+               size = ?, chunk_count = ?, indexed_at = datetime('now')
+           WHERE id = ?""",
+        (*values, row["id"]),
+    )
+    return row["id"]
+
 
-    return len(chunks)
+def _delete_chunks(db, tables: list[str], chunk_ids: list[int]) -> None:
+    """Delete chunk rows and their vectors (FTS is cleaned by trigger)."""
+    timing.count("chunks_deleted", len(chunk_ids))
+    for table in tables:
+        db.executemany(f"DELETE FROM {table} WHERE chunk_id = ?", [(i,) for i in chunk_ids])
+    db.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in chunk_ids])
 
 
-def _delete_file(db, file_path: str) -> None:
+def _read_content(db, file_info: FileInfo) -> tuple[list[str], int]:
+    """Read a file, refresh its hash/size and detect pure appends.
+
+    The stored ``hash`` of a file is the SHA-256 of the first ``size``
+    bytes that were indexed. If the file grew and those bytes still hash
+    the same, it was only appended to and everything before the section
+    containing the old end of file is unchanged.
+
+    Returns ``(lines, first_line)`` where *first_line* is the first line
+    that needs re-chunking (``0`` for a full re-chunk).
+    """
+    with open(file_info["abs_path"], "rb") as f:
+        data = f.read()
+
+    stored = db.execute(
+        "SELECT hash, size FROM files WHERE path = ?", (file_info["path"],)
+    ).fetchone()
+    prefix_len = stored["size"] if stored and stored["size"] else 0
+
+    h = hashlib.sha256()
+    appended = False
+    if 0 < prefix_len < len(data):
+        view = memoryview(data)
+        h.update(view[:prefix_len])
+        appended = h.hexdigest() == stored["hash"]
+        h.update(view[prefix_len:])
+    else:
+        h.update(data)
+    file_info["hash"] = h.hexdigest()
+    file_info["size"] = len(data)
+
+    # Same newline handling as reading the file in text mode
+    lines = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+    first_line = 0
+    if appended:
+        # Line breaks in the indexed prefix, counted like universal newlines
+        # (LF, CR and CRLF); lines before this index were complete in it.
+        complete = (data.count(b"\n", 0, prefix_len) + data.count(b"\r", 0, prefix_len)
+                    - data.count(b"\r\n", 0, prefix_len))
+        first_line = section_start(lines, complete - 1) if complete else 0
+    return lines, first_line
+
+
+class _EmbedQueue:
+    """New chunks waiting to be embedded and inserted, across files.
+
+    Gathering chunks from every changed file lets the model see a few large,
+    length-sorted batches instead of one small (or one unbounded) batch per
+    file. The queue is flushed whenever it holds ``_FLUSH_CHUNKS`` chunks so
+    memory stays bounded on a full rebuild.
+
+    Chunks are embedded with the index's model and inserted into its live
+    vector table; *tables* lists every vector table (see
+    :func:`db.vec_tables`).
+    """
+
+    def __init__(self, db, model: str, tables: list[str]) -> None:
+        self.db = db
+        self.model = model
+        self.tables = tables
+        self.pending: list[tuple[FileInfo, int, int, Chunk, str]] = []
+        self.inserted = 0
+        self.embedded = 0
+
+    def add(
+        self, file_info: FileInfo, file_id: int, chunk_index: int, chunk: Chunk, digest: str,
+    ) -> None:
+        self.pending.append((file_info, file_id, chunk_index, chunk, digest))
+        if len(self.pending) >= _FLUSH_CHUNKS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Embed every queued chunk and insert its rows."""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        with timing.stage("embed"):
+            blobs, embedded = embed_cache.embed(
+                self.db,
+                [chunk["text"] for _fi, _fid, _idx, chunk, _digest in pending],
+                [digest for _fi, _fid, _idx, _chunk, digest in pending],
+                self.model,
+            )
+        with timing.stage("write"):
+            # Assign ids up front so chunks and vectors go in with executemany
+            next_id = self.db.execute(
+                "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'chunks'), 0), "
+                "COALESCE((SELECT MAX(id) FROM chunks), 0)) + 1"
+            ).fetchone()[0]
+            ids = range(next_id, next_id + len(pending))
+            self.db.executemany(
+                """INSERT INTO chunks
+                   (id, file_id, chunk_index, text, start_line, end_line, heading, token_count,
+                    text_hash)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (chunk_id, file_id, chunk_index, chunk["text"], chunk["start_line"],
+                     chunk["end_line"], chunk["heading"], chunk["token_count"], digest)
+                    for chunk_id, (_fi, file_id, chunk_index, chunk, digest) in zip(ids, pending)
+                ],
+            )
+            self.db.executemany(
+                vec_insert_sql(self.tables[0]),
+                [
+                    (chunk_id, blob, file_info["namespace"], file_info["agent"] or "", file_id)
+                    for chunk_id, (file_info, file_id, _idx, _chunk, _digest), blob
+                    in zip(ids, pending, blobs)
+                ],
+            )
+        self.inserted += len(pending)
+        self.embedded += embedded
+        timing.count("chunks_inserted", len(pending))
+        timing.count("chunks_embedded", embedded)
+
+
+def _index_file(
+    db, file_info: FileInfo, queue: _EmbedQueue, truncation: Truncation | None = None,
+) -> tuple[int, int]:
+    """Chunk a file and bring its rows in the index up to date.
+
+    The new chunks are diffed against the chunks already stored for the
+    file: chunks whose text and heading are unchanged keep their row (only
+    their position columns are updated if they moved), stale chunks are
+    deleted and only genuinely new chunks are queued on *queue* for
+    embedding and insertion. When the file was only appended to, just the
+    sections from the old end of file onwards are re-chunked and diffed.
+    *truncation* is passed on to :func:`_chunk_lines`, with the model of
+    *queue*.
+
+    Returns ``(chunk count, chunks queued)``.
+    """
+    with timing.stage("read"):
+        lines, first_line = _read_content(db, file_info)
+
+    with timing.stage("chunk"):
+        chunks = _chunk_lines(lines, first_line, truncation, queue.model)
+        hashes = [text_hash(c["text"]) for c in chunks]
+    file_id = _upsert_file(db, file_info, 0)
+
+    # Chunks of the untouched sections before first_line are kept as-is
+    first_index = db.execute(
+        "SELECT COUNT(*) FROM chunks WHERE file_id = ? AND start_line < ?",
+        (file_id, first_line),
+    ).fetchone()[0]
+    chunk_count = first_index + len(chunks)
+    db.execute("UPDATE files SET chunk_count = ? WHERE id = ?", (chunk_count, file_id))
+
+    # Stored chunks, grouped by identity (text hash + heading) in file order
+    stored: dict[tuple[str, str | None], list] = {}
+    for row in db.execute(
+        """SELECT id, chunk_index, start_line, end_line, token_count, heading, text_hash
+           FROM chunks WHERE file_id = ? AND start_line >= ? ORDER BY chunk_index""",
+        (file_id, first_line),
+    ):
+        stored.setdefault((row["text_hash"], row["heading"]), []).append(row)
+
+    to_insert: list[int] = []
+    moved: list[tuple] = []
+    for offset, (chunk, digest) in enumerate(zip(chunks, hashes)):
+        idx = first_index + offset
+        candidates = stored.get((digest, chunk["heading"]))
+        if not candidates:
+            to_insert.append(offset)
+            continue
+        row = candidates.pop(0)
+        position = (idx, chunk["start_line"], chunk["end_line"], chunk["token_count"])
+        if position != (row["chunk_index"], row["start_line"], row["end_line"], row["token_count"]):
+            moved.append((*position, row["id"]))
+
+    stale = [row["id"] for rows in stored.values() for row in rows]
+    if stale:
+        _delete_chunks(db, queue.tables, stale)
+
+    # Position-only updates do not touch text/heading, so FTS is left alone
+    timing.count("chunks_moved", len(moved))
+    db.executemany(
+        """UPDATE chunks SET chunk_index = ?, start_line = ?, end_line = ?, token_count = ?
+           WHERE id = ?""",
+        moved,
+    )
+
+    for offset in to_insert:
+        queue.add(file_info, file_id, first_index + offset, chunks[offset], hashes[offset])
+
+    return chunk_count, len(to_insert)
+
+
+def _retag_file(
+    db, queue: _EmbedQueue, file_id: int, namespace: str, agent: str | None,
+) -> None:
+    """Move an unchanged file's rows to a new namespace/agent.
+
+    The namespace is a vec0 partition key, which cannot be updated in
+    place, so the file's vectors are re-inserted from the embedding cache.
+    A re-embedding in progress picks the file up again when it finishes.
+    """
+    db.execute("UPDATE files SET namespace = ?, agent = ? WHERE id = ?",
+               (namespace, agent, file_id))
+    rows = db.execute(
+        "SELECT id, text_hash FROM chunks WHERE file_id = ?", (file_id,)
+    ).fetchall()
+    blobs = embed_cache.lookup(db, [row["text_hash"] for row in rows], queue.model)
+    for table in queue.tables:
+        db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+    db.executemany(
+        vec_insert_sql(queue.tables[0]),
+        [(row["id"], blobs[row["text_hash"]], namespace, agent or "", file_id)
+         for row in rows if row["text_hash"] in blobs],
+    )
+
+
+def _delete_file(db, tables: list[str], file_path: str) -> None:
     """Delete a file and all its chunks (cascading) from the database."""
     row = db.execute("SELECT id FROM files WHERE path = ?", (file_path,)).fetchone()
     if row is None:
@@ -181,10 +433,8 @@ def _delete_file(db, file_path: str) -> None:
     file_id = row["id"]
 
     # Delete vector rows first (no cascade on virtual table)
-    db.execute(
-        "DELETE FROM chunks_vec WHERE chunk_id IN (SELECT id FROM chunks WHERE file_id = ?)",
-        (file_id,),
-    )
+    for table in tables:
+        db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
     # Cascade will clean chunks + FTS via triggers
     db.execute("DELETE FROM files WHERE id = ?", (file_id,))
 
@@ -193,11 +443,26 @@ def _delete_file(db, file_path: str) -> None:
 # Public API
 # ---------------------------------------------------------------------------
 
+def _print_truncation(truncation: Truncation) -> None:
+    estimated = (f"{truncation['estimated_over']}/{truncation['estimated']} chunk(s) "
+                 f"with 4-characters-per-token sizing")
+    if CHUNK_TOKENIZER == "model":
+        print(f"  Truncated by the model ({truncation['budget']}-token input): "
+              f"{truncation['sized_over']}/{truncation['sized']} chunk(s) "
+              f"(would have been {estimated})")
+    else:
+        print(f"  Truncated by the model ({truncation['budget']}-token input): {estimated} "
+              f"(FORGE_CHUNK_TOKENIZER=model sizes chunks to fit)")
+
+
 def sync(
     project_root: str,
     *,
     force: bool = False,
     verbose: bool = False,
+    db: sqlite3.Connection | None = None,
+    changes: ChangeSet | None = None,
+    wait: float | None = SYNC_WAIT_TIMEOUT,
 ) -> SyncStats:
     """Synchronise .forge/memory/ markdown files into the SQLite index.
 
@@ -209,10 +474,25 @@ def sync(
         If ``True``, re-index all files regardless of hash changes.
     verbose:
         If ``True``, print progress information.
+    db:
+        Open connection to reuse (e.g. from the daemon). When omitted, a
+        connection is opened and closed by this call.
+    changes:
+        Change set from :func:`manifest.scan` on the same connection, so a
+        caller that already checked freshness does not rescan the trees.
+        Ignored if another sync had to be waited for.
+    wait:
+        Seconds to wait for a sync running in another process (``None``:
+        as long as it takes, ``0``: not at all).
 
     Returns
     -------
-    A dict with keys: added, updated, deleted, unchanged.
+    A dict with keys: added, updated, deleted, unchanged, embedded.
+
+    Raises
+    ------
+    TimeoutError
+        If another process is still syncing after *wait* seconds.
     """
     memory_dir = get_memory_dir(project_root)
     db_path = get_db_path(project_root)
@@ -220,53 +500,193 @@ def sync(
     if not os.path.isdir(memory_dir):
         raise FileNotFoundError(f"Memory directory not found: {memory_dir}")
 
-    db = init_db(db_path)
-
-    stats: SyncStats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    own_db = db is None
+    if own_db:
+        with timing.stage("open_db"):
+            db = init_db(db_path)
+
+    try:
+        with writer_lock(db_path, wait) as waited:
+            if waited:
+                # The other sync indexed the changes seen before waiting
+                timing.count("sync_waited")
+                if verbose:
+                    print("  Waited for another sync; rescanning")
+                changes = None
+            with telemetry.recorded(db, "sync"):
+                try:
+                    return _sync(db, project_root, force=force, verbose=verbose,
+                                 changes=changes)
+                except BaseException:
+                    # Leave a caller's connection (the daemon's) outside the
+                    # write transaction, or it would hold the index locked
+                    db.rollback()
+                    raise
+    finally:
+        if own_db:
+            db.close()
+
+
+def _sync(
+    db: sqlite3.Connection,
+    project_root: str,
+    *,
+    force: bool,
+    verbose: bool,
+    changes: ChangeSet | None,
+) -> SyncStats:
+    """Body of :func:`sync` on an open connection."""
+    stats: SyncStats = {
+        "added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "embedded": 0,
+    }
 
-    # Scan files on disk — memory dir + extra dirs
-    disk_files = scan_files(memory_dir, project_root)
-    for extra_dir in get_extra_scan_dirs(project_root):
-        disk_files.extend(
-            scan_files(extra_dir, project_root, namespace_override="project")
-        )
-    disk_map = {fi["path"]: fi for fi in disk_files}
+    if changes is None:
+        with timing.stage("scan"):
+            changes = manifest.scan(db, project_root)
+    disk_map = changes["files"]
 
     # Get current state from DB
-    db_rows = db.execute("SELECT id, path, hash FROM files").fetchall()
-    db_map = {row["path"]: dict(row) for row in db_rows}
-
-    # Detect deleted files (in DB but not on disk)
-    for db_path_key in list(db_map.keys()):
-        if db_path_key not in disk_map:
+    db_map = {
+        row["path"]: dict(row)
+        for row in db.execute("SELECT id, path, hash, namespace, agent FROM files")
+    }
+
+    # Chunks cut with other settings (size, overlap, tokenizer) would never
+    # be diffed equal to new ones: re-chunk everything at once
+    chunking = chunking_fingerprint()
+    stored_chunking = get_meta(db).get("chunking")
+    chunked_with = indexed_chunking(db)
+    if chunked_with != chunking and db_map and not force:
+        if verbose:
+            print(f"  Chunking changed ({chunked_with} -> {chunking}): re-chunking every file")
+        force = True
+    if force and not changes["complete"]:
+        # A rebuild deletes every file's rows, so it must see every file,
+        # not only the paths a watcher reported
+        with timing.stage("scan"):
+            changes = manifest.scan(db, project_root)
+        disk_map = changes["files"]
+
+    # --force and the first sync of a project load every chunk: skip the
+    # per-row FTS triggers and rebuild the full-text index once at the end
+    bulk = force or not db_map
+    with bulk_load(db) if bulk else contextlib.nullcontext():
+        # Take the write lock before reading which vector tables exist, so a
+        # background re-embedding cannot switch tables under this sync
+        if not db.in_transaction:
+            db.execute("BEGIN IMMEDIATE")
+        # New chunks go into the vectors searches currently use; the
+        # re-embedding moves them to the configured model later
+        model = index_model(db)[0]
+        tables = vec_tables(db)
+
+        if stored_chunking != chunking:
+            db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('chunking', ?)", (chunking,),
+            )
+
+        if force:
+            # Rebuild every file's rows from scratch
+            for table in tables:
+                db.execute(f"DELETE FROM {table}")
+            db.execute("DELETE FROM files")
+            # The directory manifest lets scans rebuild unchanged listings
+            # from the files rows; without them it would hide those files
+            db.execute("DELETE FROM dirs")
+
+        # Detect deleted files (in DB but not on disk)
+        for db_path_key in changes["deleted"]:
             if verbose:
                 print(f"  - Deleted: {db_path_key}")
-            _delete_file(db, db_path_key)
+            with timing.stage("delete"):
+                _delete_file(db, tables, db_path_key)
             stats["deleted"] += 1
 
-    # Process files on disk
-    for rel_path, file_info in disk_map.items():
-        if rel_path in db_map:
-            if not force and file_info["hash"] == db_map[rel_path]["hash"]:
-                stats["unchanged"] += 1
-                continue
-            # Updated file
-            if verbose:
-                print(f"  ~ Updated: {rel_path}")
-            _delete_file(db, rel_path)
-            count = _index_file(db, file_info)
-            if verbose:
-                print(f"    ({count} chunks)")
-            stats["updated"] += 1
-        else:
-            # New file
-            if verbose:
-                print(f"  + Added: {rel_path}")
-            count = _index_file(db, file_info)
+        # Two-tier change detection: the manifest already skipped files whose
+        # (size, mtime_ns, inode) match the stored values; dirty files that are
+        # already indexed are hashed to tell real edits from mere touches.
+        candidates = list(disk_map) if force else changes["dirty"]
+        stats["unchanged"] = len(disk_map) - len(candidates)
+        if not force:
+            with timing.stage("hash"):
+                manifest.hash_files([
+                    disk_map[path] for path in candidates
+                    if path in db_map and disk_map[path]["hash"] is None
+                ])
+
+        # Process new and changed files; new chunks are embedded in batches
+        # that span files
+        queue = _EmbedQueue(db, model, tables)
+        truncation: Truncation | None = None
+        if verbose and _can_count_tokens(model):
+            truncation = {"budget": 0, "estimated": 0, "estimated_over": 0,
+                          "sized": 0, "sized_over": 0}
+        started = time.perf_counter()
+        for rel_path in candidates:
+            file_info = disk_map[rel_path]
+            if rel_path in db_map:
+                row = db_map[rel_path]
+                if not force and file_info["hash"] == row["hash"]:
+                    # Touched but not modified: remember the new stat tuple
+                    db.execute(
+                        "UPDATE files SET mtime = ?, mtime_ns = ?, inode = ?, size = ? WHERE id = ?",
+                        (file_info["mtime"], manifest.trusted_mtime_ns(file_info["mtime_ns"]),
+                         file_info["inode"], file_info["size"], row["id"]),
+                    )
+                    stats["unchanged"] += 1
+                    continue
+                # Updated file: --force rebuilds its rows from scratch, otherwise
+                # only the chunks that changed are rewritten
+                if verbose:
+                    print(f"  ~ Updated: {rel_path}")
+                stats["updated"] += 1
+            else:
+                # New file
+                if verbose:
+                    print(f"  + Added: {rel_path}")
+                stats["added"] += 1
+            count, queued = _index_file(db, file_info, queue, truncation)
             if verbose:
-                print(f"    ({count} chunks)")
-            stats["added"] += 1
-
-    db.commit()
-    db.close()
+                print(f"    ({count} chunks, {queued} new)")
+        queue.flush()
+        stats["embedded"] = queue.embedded
+
+        # Files whose namespace rules changed since they were indexed
+        retagged = 0
+        if not force:
+            for rel_path, row in db_map.items():
+                file_info = disk_map.get(rel_path)
+                if file_info and (row["namespace"], row["agent"]) != (
+                    file_info["namespace"], file_info["agent"]
+                ):
+                    with timing.stage("retag"):
+                        _retag_file(db, queue, row["id"], file_info["namespace"],
+                                   file_info["agent"])
+                    retagged += 1
+
+        # Cached search results of the previous generation are now stale
+        if force or retagged or stats["added"] or stats["updated"] or stats["deleted"]:
+            bump_generation(db)
+
+        if verbose and queue.inserted:
+            elapsed = time.perf_counter() - started
+            print(f"  Indexed {queue.inserted} chunk(s) in {elapsed:.2f}s "
+                  f"({queue.inserted / max(elapsed, 1e-9):.0f} chunks/s, "
+                  f"{queue.embedded} embedded)")
+        if truncation and truncation["estimated"]:
+            _print_truncation(truncation)
+
+    # Drop cached vectors for text that no longer exists anywhere
+    if stats["updated"] or stats["deleted"]:
+        with timing.stage("evict"):
+            evicted = embed_cache.evict(db)
+        if verbose and evicted:
+            print(f"  Evicted {evicted} unused cached embedding(s)")
+
+    manifest.save_dirs(db, changes)
+    with timing.stage("commit"):
+        db.commit()
+    reembed.start_if_needed(db, project_root)
+    for key in ("added", "updated", "deleted", "unchanged"):
+        timing.count(f"files_{key}", stats[key])
     return stats
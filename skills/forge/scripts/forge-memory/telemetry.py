@@ -0,0 +1,204 @@
+"""FORGE Vector Memory — Persistent sync and search latencies.
+
+Every :func:`sync.sync`, :func:`search.search` and :func:`search.search_batch`
+call appends one row to the ``telemetry`` table of ``index.sqlite``: when
+it finished, its total time, and the :mod:`timing` stages and counters it
+went through. The table is a ring buffer of ``FORGE_TELEMETRY_ROWS`` rows
+(0 disables recording), so it stays small however long the project lives.
+
+``forge-memory stats`` summarises the table as latency percentiles per
+command, per day (or week, or month) and per stage, which shows how a
+project's memory slows down, or not, as it grows.
+
+Recording never gets in the way of the command itself: the row is written
+in its own transaction that does not wait for other writers nor sync to
+disk, and is kept in memory for the next call if the database is busy.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+
+import timing
+from config import TELEMETRY_MAX_ROWS
+from db import write_if_free
+
+# Rows waiting for the database to be free (bounded: a daemon behind a
+# long sync must not grow without limit)
+_pending: list[tuple[float, str, float, str, str]] = []
+_MAX_PENDING = 1000
+
+_SINCE_RE = re.compile(r"^(\d+)([mhdw])$")
+_SINCE_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+def _flush(db: sqlite3.Connection) -> None:
+    db.executemany(
+        "INSERT INTO telemetry (ts, command, total_ms, stages, counters) "
+        "VALUES (?, ?, ?, ?, ?)",
+        _pending,
+    )
+    last = db.execute("SELECT MAX(id) FROM telemetry").fetchone()[0]
+    db.execute("DELETE FROM telemetry WHERE id <= ?", (last - TELEMETRY_MAX_ROWS,))
+
+
+def _write(db: sqlite3.Connection, profile: timing.Profile) -> None:
+    report = profile.report()
+    _pending.append((
+        time.time(),
+        report["command"],
+        report["total_ms"],
+        json.dumps(report["stages_ms"]),
+        json.dumps(report["counters"]),
+    ))
+    del _pending[:-_MAX_PENDING]
+    # If the database is busy, the rows are kept for next time
+    if write_if_free(db, _flush):
+        _pending.clear()
+
+
+@contextlib.contextmanager
+def recorded(db: sqlite3.Connection, command: str) -> Iterator[None]:
+    """Profile the block and append it to the telemetry table.
+
+    Nothing is recorded if the block raises or telemetry is disabled.
+    """
+    if TELEMETRY_MAX_ROWS <= 0:
+        yield
+        return
+    with timing.profiling(command) as profile:
+        yield
+    _write(db, profile)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def parse_since(value: str) -> float:
+    """Return the Unix time described by *value*.
+
+    Accepts a duration back from now (``30m``, ``12h``, ``7d``, ``4w``) or
+    an ISO date or datetime (``2026-01-31``, ``2026-01-31T09:00``).
+
+    Raises
+    ------
+    ValueError
+        If *value* is neither.
+    """
+    match = _SINCE_RE.match(value.strip())
+    if match:
+        amount, unit = match.groups()
+        delta = timedelta(**{_SINCE_UNITS[unit]: int(amount)})
+        return (datetime.now() - delta).timestamp()
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"--since must be a duration such as 7d, 12h or 30m, or an ISO date, "
+            f"not {value!r}"
+        ) from None
+
+
+def _period(ts: float, by: str) -> str:
+    day = datetime.fromtimestamp(ts)
+    if by == "week":
+        year, week, _weekday = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if by == "month":
+        return day.strftime("%Y-%m")
+    return day.strftime("%Y-%m-%d")
+
+
+def _percentiles(samples_ms: list[float]) -> dict[str, float]:
+    """Summarise latencies in milliseconds, nearest-rank."""
+    ordered = sorted(samples_ms)
+
+    def pick(pct: float) -> float:
+        return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+    return {
+        "n": len(ordered),
+        "p50_ms": round(pick(50), 3),
+        "p95_ms": round(pick(95), 3),
+        "p99_ms": round(pick(99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def summary(
+    db: sqlite3.Connection,
+    *,
+    since: float | None = None,
+    command: str | None = None,
+    by: str = "day",
+) -> dict:
+    """Summarise recorded latencies per command.
+
+    Parameters
+    ----------
+    db:
+        Open connection to the index.
+    since:
+        Only use rows recorded at or after this Unix time (default: all).
+    command:
+        Only summarise this command (``sync``, ``search``, ``search_batch``).
+    by:
+        Period of the latency trend: ``day``, ``week`` or ``month``.
+
+    Returns
+    -------
+    A JSON-serialisable dict. ``commands`` maps each command to its overall
+    percentiles, the same percentiles per period (oldest first), per-stage
+    percentiles and the mean and max of each counter.
+    """
+    sql = "SELECT ts, command, total_ms, stages, counters FROM telemetry WHERE ts >= ?"
+    params: list = [since or 0.0]
+    if command:
+        sql += " AND command = ?"
+        params.append(command)
+    rows = db.execute(sql + " ORDER BY id", params).fetchall()
+
+    grouped: dict[str, list] = {}
+    for row in rows:
+        grouped.setdefault(row["command"], []).append(row)
+
+    commands = {}
+    for name, group in sorted(grouped.items()):
+        periods: dict[str, list[float]] = {}
+        stages: dict[str, list[float]] = {}
+        counters: dict[str, list[int]] = {}
+        for row in group:
+            periods.setdefault(_period(row["ts"], by), []).append(row["total_ms"])
+            for stage, ms in json.loads(row["stages"]).items():
+                stages.setdefault(stage, []).append(ms)
+            for counter, n in json.loads(row["counters"]).items():
+                counters.setdefault(counter, []).append(n)
+        commands[name] = {
+            **_percentiles([row["total_ms"] for row in group]),
+            "periods": {period: _percentiles(ms) for period, ms in sorted(periods.items())},
+            "stages": {stage: _percentiles(ms) for stage, ms in stages.items()},
+            # Counters a run did not touch were zero for that run
+            "counters": {
+                counter: {"mean": round(sum(ns) / len(group), 2), "max": max(ns)}
+                for counter, ns in counters.items()
+            },
+        }
+
+    first = rows[0]["ts"] if rows else None
+    return {
+        "since": datetime.fromtimestamp(since).isoformat(timespec="seconds") if since else None,
+        "first": datetime.fromtimestamp(first).isoformat(timespec="seconds") if first else None,
+        "rows": len(rows),
+        "by": by,
+        "commands": commands,
+    }
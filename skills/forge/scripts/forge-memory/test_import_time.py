@@ -0,0 +1,61 @@
+"""FORGE Vector Memory — Import-time regression check.
+
+Commands that never touch the index (``log``, ``consolidate``, ``--help``)
+must not pay for the embedding or sqlite-vec stacks: ``cli`` imports
+``search``, ``sync``, ``db`` and ``embedder`` lazily, and those import
+numpy, sqlite_vec and the model backends lazily in turn.
+
+Runs ``cli.py log`` in a throwaway project under ``python -X importtime``
+and fails if any of those modules was imported. Run it with pytest or
+directly: ``python test_import_time.py``.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules a ``log`` must not import
+FORBIDDEN = frozenset({
+    "numpy",
+    "sqlite_vec",
+    "torch",
+    "sentence_transformers",
+    "onnxruntime",
+    "search",
+    "sync",
+    "db",
+    "embedder",
+})
+
+
+def imported_modules(*args: str) -> set[str]:
+    """Return the top-level modules ``cli.py *args`` imports."""
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, ".forge", "memory"))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.join(_SCRIPT_DIR, "cli.py"), *args],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    # Lines look like "import time:   123 |   456 |   package.module"
+    return {
+        line.rpartition("|")[2].strip().split(".")[0]
+        for line in proc.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def test_log_skips_heavy_imports() -> None:
+    heavy = FORBIDDEN & imported_modules("log", "import-time check")
+    assert not heavy, f"cli.py log imported {', '.join(sorted(heavy))}"
+
+
+if __name__ == "__main__":
+    test_log_skips_heavy_imports()
+    print("OK: cli.py log imports none of " + ", ".join(sorted(FORBIDDEN)))
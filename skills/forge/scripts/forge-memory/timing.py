@@ -0,0 +1,107 @@
+"""FORGE Vector Memory — Per-stage timing instrumentation.
+
+``--profile`` on ``search`` and ``sync`` (or ``FORGE_PROFILE=1``, e.g. for
+hooks) records monotonic wall time for each pipeline stage plus a few
+counters, and prints them as one JSON object on stderr::
+
+    {"command": "search", "total_ms": 41.2,
+     "stages_ms": {"auto_sync": 3.1, "auto_sync.scan": 2.9,
+                   "query_embed": 30.5, "vec_knn": 1.8, ...},
+     "counters": {"files_scanned": 12, "vec_candidates": 15, ...}}
+
+A stage opened inside another is reported as ``outer.inner``, and its time
+is also part of the outer stage. Stages entered repeatedly (once per file,
+once per query) accumulate. Without an active profile, :func:`stage` and
+:func:`count` return immediately, so the hooks stay in the code for good.
+
+Profiles can be nested: every active profile records the stages run while
+it is active. :mod:`telemetry` uses this to keep its own profile of each
+search and sync while ``--profile`` covers the whole command.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import sys
+import time
+from typing import Iterator
+
+
+class Profile:
+    """Stage timings and counters collected while profiling is active."""
+
+    def __init__(self, command: str) -> None:
+        self.command = command
+        self.stages: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.stack: list[str] = []
+        self.started = time.perf_counter()
+        self.total: float | None = None
+
+    def report(self) -> dict:
+        """Return the profile as a JSON-serialisable dict."""
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        return {
+            "command": self.command,
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+# Profiles recording right now, outermost first. The daemon serves one
+# request at a time, so this never mixes stages from different requests.
+_active: list[Profile] = []
+
+
+@contextlib.contextmanager
+def profiling(command: str, enabled: bool = True) -> Iterator[Profile | None]:
+    """Collect a :class:`Profile` for the duration of the block.
+
+    Yields ``None`` (and records nothing) when *enabled* is false.
+    """
+    if not enabled:
+        yield None
+        return
+    profile = Profile(command)
+    _active.append(profile)
+    try:
+        yield profile
+    finally:
+        profile.total = time.perf_counter() - profile.started
+        _active.remove(profile)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the wall time of the block to stage *name*."""
+    if not _active:
+        yield
+        return
+    profiles = list(_active)
+    keys = []
+    for profile in profiles:
+        profile.stack.append(name)
+        key = ".".join(profile.stack)
+        # Stages are listed in the order they were first entered
+        profile.stages.setdefault(key, 0.0)
+        keys.append(key)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        for profile, key in zip(profiles, keys):
+            profile.stages[key] += elapsed
+            profile.stack.pop()
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add *n* to counter *name*."""
+    for profile in _active:
+        profile.counters[name] = profile.counters.get(name, 0) + n
+
+
+def print_report(report: dict) -> None:
+    """Print a :meth:`Profile.report` as one JSON line on stderr."""
+    print(json.dumps(report), file=sys.stderr, flush=True)
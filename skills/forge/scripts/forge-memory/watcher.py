@@ -0,0 +1,260 @@
+"""FORGE Vector Memory — Watch mode with incremental indexing.
+
+``forge-memory watch`` keeps the index current while memory is being
+written: it watches .forge/memory/ and the extra scan directories with Linux
+inotify (via ctypes, no extra dependency), debounces bursts of writes and
+feeds only the touched files into :func:`sync.sync`. On other platforms, or
+when inotify is unavailable, it falls back to polling with
+:func:`manifest.scan`.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+import manifest
+from config import get_db_path, get_extra_scan_dirs, get_memory_dir
+
+# inotify event masks (from <sys/inotify.h>)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+
+# struct inotify_event header: int wd; uint32 mask, cookie, len
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Never hold back a flush longer than this many debounce periods, even if
+# writes keep coming
+_MAX_DELAY_FACTOR = 10
+
+# Longest wait, in seconds, before retrying a flush that keeps failing
+_MAX_RETRY_DELAY = 60.0
+
+
+# ---------------------------------------------------------------------------
+# inotify
+# ---------------------------------------------------------------------------
+
+class _Inotify:
+    """Minimal recursive inotify wrapper over libc."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths: dict[int, str] = {}
+
+    def add_tree(self, root: str) -> None:
+        """Watch *root* and every directory below it."""
+        for dirpath, _dirs, _files in os.walk(root):
+            wd = self._add_watch(self.fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dirpath}")
+            self._paths[wd] = dirpath
+
+    def read(self, timeout: float | None) -> list[tuple[str, int]]:
+        """Wait up to *timeout* seconds and return ``(abs_path, mask)`` events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+
+        events: list[tuple[str, int]] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            base = self._paths.get(wd, "")
+            path = os.path.join(base, os.fsdecode(name)) if name else base
+            events.append((path, mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+# ---------------------------------------------------------------------------
+# Sync helpers
+# ---------------------------------------------------------------------------
+
+def _sync(project_root: str, paths: set[str] | None, verbose: bool) -> bool:
+    """Sync the given absolute *paths*, or everything when ``None``.
+
+    Returns ``False`` if nothing was synced: another process kept the index
+    locked for the whole sync wait, or the sync failed (the error is
+    logged, so a watcher keeps running past an unreadable file).
+    """
+    from db import init_db
+    from sync import sync
+
+    db = None
+    try:
+        db = init_db(get_db_path(project_root))
+        if paths is None:
+            changes = manifest.scan(db, project_root)
+        else:
+            changes = manifest.scan_paths(db, project_root, sorted(paths))
+        if not manifest.has_changes(changes):
+            if changes["complete"] and changes["dirs_changed"]:
+                manifest.save_dirs(db, changes)
+                db.commit()
+            return True
+        stats = sync(project_root, db=db, changes=changes, verbose=verbose)
+    except TimeoutError as exc:
+        print(f"[{time.strftime('%H:%M:%S')}] sync deferred: {exc}", file=sys.stderr, flush=True)
+        return False
+    except Exception as exc:
+        print(f"[{time.strftime('%H:%M:%S')}] sync failed: {type(exc).__name__}: {exc}",
+              file=sys.stderr, flush=True)
+        return False
+    finally:
+        if db is not None:
+            db.close()
+
+    # Touched-but-unmodified files are not worth a line
+    if not (stats["added"] or stats["updated"] or stats["deleted"]):
+        return True
+    print(f"[{time.strftime('%H:%M:%S')}] synced: "
+          f"+{stats['added']} ~{stats['updated']} -{stats['deleted']} "
+          f"({stats['embedded']} chunk(s) embedded)", flush=True)
+    return True
+
+
+def _watch_roots(project_root: str) -> list[str]:
+    return [get_memory_dir(project_root)] + get_extra_scan_dirs(project_root)
+
+
+def _watch_inotify(project_root: str, debounce: float, verbose: bool) -> None:
+    ino = _Inotify()
+    try:
+        for root in _watch_roots(project_root):
+            ino.add_tree(root)
+        print(f"Watching {len(_watch_roots(project_root))} tree(s) with inotify "
+              f"(debounce {debounce:g}s).", flush=True)
+
+        pending: set[str] = set()
+        full_rescan = False
+        first_event = last_event = 0.0
+        # After failed flushes: how many in a row, and no retry before retry_at
+        failures = 0
+        retry_at = 0.0
+        while True:
+            if pending or full_rescan:
+                now = time.monotonic()
+                deadline = max(retry_at, min(last_event + debounce,
+                                             first_event + debounce * _MAX_DELAY_FACTOR))
+                events = ino.read(max(0.0, deadline - now))
+            else:
+                events = ino.read(None)
+
+            now = time.monotonic()
+            for path, mask in events:
+                if mask & _IN_Q_OVERFLOW:
+                    full_rescan = True
+                elif mask & _IN_ISDIR or mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                    # A directory appeared, vanished or moved: pick up new
+                    # subtrees and let a full scan sort out the files.
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and os.path.isdir(path):
+                        ino.add_tree(path)
+                    full_rescan = True
+                elif path.lower().endswith(".md"):
+                    pending.add(path)
+                else:
+                    continue
+                if not first_event:
+                    first_event = now
+                last_event = now
+
+            if not (pending or full_rescan):
+                continue
+            if now < max(retry_at, min(last_event + debounce,
+                                       first_event + debounce * _MAX_DELAY_FACTOR)):
+                continue
+
+            if not _sync(project_root, None if full_rescan else pending, verbose):
+                # Keep the paths, and back off while the flush keeps failing
+                failures += 1
+                retry_at = time.monotonic() + min(debounce * 2 ** failures, _MAX_RETRY_DELAY)
+                continue
+            failures = 0
+            retry_at = 0.0
+            pending = set()
+            full_rescan = False
+            first_event = last_event = 0.0
+    finally:
+        ino.close()
+
+
+def _watch_polling(project_root: str, interval: float, verbose: bool) -> None:
+    print(f"Watching with polling every {interval:g}s.", flush=True)
+    while True:
+        time.sleep(interval)
+        _sync(project_root, None, verbose)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def watch(
+    project_root: str,
+    *,
+    debounce: float = 1.0,
+    poll: bool = False,
+    interval: float = 2.0,
+    verbose: bool = False,
+) -> None:
+    """Keep the index in sync with the markdown trees until interrupted.
+
+    Parameters
+    ----------
+    project_root:
+        Absolute path to the project root containing .forge/memory/.
+    debounce:
+        Seconds of quiet to wait after a write before indexing (inotify).
+    poll:
+        If ``True``, use polling even where inotify is available.
+    interval:
+        Seconds between scans in polling mode.
+    verbose:
+        If ``True``, print sync details for every flush.
+    """
+    # Catch up with anything written while nobody was watching
+    _sync(project_root, None, verbose)
+
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            _watch_inotify(project_root, debounce, verbose)
+            return
+        except OSError as exc:
+            print(f"inotify unavailable ({exc}), falling back to polling.", file=sys.stderr)
+    _watch_polling(project_root, interval, verbose)